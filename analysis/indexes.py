@@ -1,11 +1,113 @@
 """
 Functions for analyzing and recommending MySQL indexes
 """
-import re
-from typing import Dict, List, Any, Tuple
+from functools import lru_cache
+from typing import Dict, List, Any, NamedTuple, Tuple
+from analysis.patterns import _lower, iter_plan_events
+from analysis.query import _metadata_cache
 from db.connector import MySQLConnector
+from analysis.util import format_bytes
 
-def extract_potential_indexes(query: str) -> List[Dict[str, Any]]:
+_KEYWORDS = frozenset({
+    'select', 'from', 'where', 'join', 'inner', 'left', 'right', 'outer',
+    'cross', 'straight_join', 'on', 'and', 'or', 'order', 'group', 'by',
+    'having', 'limit', 'as', 'asc', 'desc', 'union', 'not', 'in', 'like',
+    'between', 'is', 'null', 'exists', 'using',
+})
+
+# Clause keywords that terminate table-reference or condition parsing
+_CLAUSE_BOUNDARY = frozenset({
+    'where', 'join', 'inner', 'left', 'right', 'outer', 'cross',
+    'straight_join', 'on', 'order', 'group', 'having', 'limit', 'union',
+})
+
+class PotentialIndex(NamedTuple):
+    """A candidate index extracted from a query"""
+    table: str
+    columns: Tuple[str, ...]
+    reason: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dict form for JSON serialization at the API boundary"""
+        return {"table": self.table, "columns": list(self.columns), "reason": self.reason}
+
+class MatchedIndex(NamedTuple):
+    """A candidate index that is already covered by an existing index"""
+    table: str
+    columns: Tuple[str, ...]
+    existing_index: str
+    reason: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dict form for JSON serialization at the API boundary"""
+        return {
+            "table": self.table,
+            "columns": list(self.columns),
+            "existing_index": self.existing_index,
+            "reason": self.reason,
+        }
+
+def _tokenize(sql: str) -> List[Tuple[str, str]]:
+    """
+    Tokenize a lowercased SQL string in a single left-to-right pass.
+
+    Yields (kind, value) tuples where kind is one of: 'kw' (SQL keyword),
+    'ident' (possibly dotted identifier), 'num', 'str' (quoted literal),
+    'op' (=), 'comma', 'lparen', 'rparen', or 'other'.
+
+    Clause boundaries (FROM/WHERE/JOIN/ORDER BY/GROUP BY/...) fall out of
+    the keyword tokens, so extract_potential_indexes recovers every clause
+    from this one scan rather than running a separate search per clause.
+    """
+    tokens = []
+    append = tokens.append
+    i = 0
+    n = len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch.isspace():
+            i += 1
+        elif ch.isalpha() or ch == '_':
+            j = i + 1
+            while j < n and (sql[j].isalnum() or sql[j] == '_' or sql[j] == '.'):
+                j += 1
+            word = sql[i:j]
+            append(('kw', word) if word in _KEYWORDS else ('ident', word))
+            i = j
+        elif ch.isdigit():
+            j = i + 1
+            while j < n and (sql[j].isalnum() or sql[j] == '.'):
+                j += 1
+            append(('num', sql[i:j]))
+            i = j
+        elif ch in '\'"`':
+            j = i + 1
+            while j < n and sql[j] != ch:
+                j += 1
+            append(('str', sql[i:j + 1]))
+            i = j + 1
+        elif ch == '=':
+            append(('op', '='))
+            i += 1
+        elif ch == ',':
+            append(('comma', ','))
+            i += 1
+        elif ch == '(':
+            append(('lparen', '('))
+            i += 1
+        elif ch == ')':
+            append(('rparen', ')'))
+            i += 1
+        else:
+            append(('other', ch))
+            i += 1
+    return tokens
+
+def _strip_schema(name: str) -> str:
+    """Remove a leading schema qualifier from a table reference"""
+    return name.split('.')[-1] if '.' in name else name
+
+def extract_potential_indexes(query: str) -> List[PotentialIndex]:
     """
     Extract potential index candidates from a query
     
@@ -15,169 +117,171 @@ def extract_potential_indexes(query: str) -> List[Dict[str, Any]]:
     Returns:
         List of potential indexes
     """
-    query_lower = query.lower()
-    potential_indexes = []
+    # Pure over the query text, so memoize on a case/whitespace-normalized
+    # key; the records are immutable tuples, so sharing them is safe.
+    key = ' '.join(_lower(query).split())
+    return list(_extract_potential_indexes(key))
+
+@lru_cache(maxsize=512)
+def _extract_potential_indexes(query: str) -> Tuple[PotentialIndex, ...]:
+    """Uncached candidate extraction over a normalized query"""
+    tokens = _tokenize(query)
+    
+    # Without a FROM clause there are no tables to attribute candidates to,
+    # so skip the clause scan entirely (non-SELECT text, EXPLAIN output and
+    # malformed SQL all land here)
+    if ('kw', 'from') not in tokens:
+        return ()
+    # Deduplicate candidates as they are emitted: the same column often shows
+    # up in WHERE, ORDER BY and GROUP BY, and unqualified columns fan out one
+    # candidate per table. Key by (table, columns) and merge the reasons so
+    # check_existing_indexes only sees each candidate once.
+    candidates: Dict[Tuple[str, Tuple[str, ...]], PotentialIndex] = {}
+    
+    def _add(table: str, columns: List[str], reason: str) -> None:
+        key = (table, tuple(columns))
+        entry = candidates.get(key)
+        if entry is None:
+            candidates[key] = PotentialIndex(table, key[1], reason)
+        elif reason not in entry.reason:
+            candidates[key] = entry._replace(reason=entry.reason + "; " + reason)
     
-    # Extract tables
     tables = []
-    from_clause_match = re.search(r'from\s+([^()]+?)(?:where|group|having|order|limit|\$)', query_lower, re.DOTALL)
+    # Alias -> table name map maintained alongside the tables list so each
+    # column reference resolves in O(1) instead of scanning the list.
+    alias_to_table = {}
     
-    if from_clause_match:
-        from_clause = from_clause_match.group(1).strip()
-        # Handle multiple tables (comma-separated or joined)
-        table_parts = re.split(r',|\sjoin\s', from_clause)
+    n = len(tokens)
+    i = 0
+    while i < n:
+        kind, value = tokens[i]
+        if kind != 'kw':
+            i += 1
+            continue
         
-        for part in table_parts:
-            # Extract table name, handling aliases
-            table_match = re.search(r'([a-z0-9_\.]+)(?:\s+(?:as\s+)?([a-z0-9_]+))?', part.strip())
-            if table_match:
-                table_name = table_match.group(1)
-                alias = table_match.group(2) if table_match.group(2) else table_name
-                
-                # Remove schema prefix if present
-                if '.' in table_name:
-                    table_name = table_name.split('.')[-1]
-                
+        if value == 'from':
+            # Collect comma-separated table references with optional aliases
+            i += 1
+            while i < n:
+                kind, value = tokens[i]
+                if kind == 'comma':
+                    i += 1
+                    continue
+                if kind != 'ident':
+                    break
+                ref = value
+                alias = ref
+                i += 1
+                if i < n and tokens[i] == ('kw', 'as'):
+                    i += 1
+                if i < n and tokens[i][0] == 'ident':
+                    alias = tokens[i][1]
+                    i += 1
+                table_name = _strip_schema(ref)
                 tables.append({"name": table_name, "alias": alias})
-    
-    # Extract WHERE conditions
-    where_clause_match = re.search(r'where\s+(.+?)(?:group|having|order|limit|\$)', query_lower, re.DOTALL)
-    
-    if where_clause_match:
-        where_clause = where_clause_match.group(1).strip()
-        # Split by AND
-        conditions = re.split(r'\sand\s', where_clause)
+                alias_to_table[alias] = table_name
+        
+        elif value == 'join':
+            # Joined table with optional alias, then equality conditions in ON
+            i += 1
+            if i >= n or tokens[i][0] != 'ident':
+                continue
+            table_name = _strip_schema(tokens[i][1])
+            alias = tokens[i][1]
+            i += 1
+            if i < n and tokens[i] == ('kw', 'as'):
+                i += 1
+            if i < n and tokens[i][0] == 'ident':
+                alias = tokens[i][1]
+                i += 1
+            tables.append({"name": table_name, "alias": alias})
+            alias_to_table[alias] = table_name
+            
+            if i < n and tokens[i] == ('kw', 'on'):
+                i += 1
+                # Scan the ON condition for ident = ident pairs
+                while i < n and not (tokens[i][0] == 'kw' and tokens[i][1] in _CLAUSE_BOUNDARY):
+                    if (tokens[i][0] == 'ident' and i + 2 < n
+                            and tokens[i + 1] == ('op', '=')
+                            and tokens[i + 2][0] == 'ident'):
+                        for col in (tokens[i][1], tokens[i + 2][1]):
+                            if '.' in col:
+                                col_table_alias, col_name = col.split('.')[:2]
+                                col_table_name = alias_to_table.get(col_table_alias)
+                                if col_table_name == table_name:
+                                    _add(table_name, [col_name], "Join condition")
+                        i += 3
+                    else:
+                        i += 1
         
-        for condition in conditions:
+        elif value == 'where':
             # Look for equality conditions (column = value)
-            eq_match = re.search(r'([a-z0-9_\.]+)\s*=\s*', condition)
-            if eq_match:
-                column_ref = eq_match.group(1)
-                
-                # Determine table and column
-                if '.' in column_ref:
-                    parts = column_ref.split('.')
-                    table_alias = parts[0]
-                    column_name = parts[1]
-                    
-                    # Find the actual table name from alias
-                    table_name = next((t["name"] for t in tables if t["alias"] == table_alias), None)
-                    
+            i += 1
+            while i < n and not (tokens[i][0] == 'kw' and tokens[i][1] in ('group', 'having', 'order', 'limit', 'union')):
+                if (tokens[i][0] == 'ident' and i + 1 < n
+                        and tokens[i + 1] == ('op', '=')):
+                    column_ref = tokens[i][1]
+                    if '.' in column_ref:
+                        table_alias, column_name = column_ref.split('.')[:2]
+                        table_name = alias_to_table.get(table_alias)
+                        if table_name:
+                            _add(table_name, [column_name], "Equality condition in WHERE clause")
+                    else:
+                        # Column without table reference - try to match to all tables
+                        for table in tables:
+                            _add(table["name"], [column_ref], "Possible equality condition in WHERE clause")
+                    i += 2
+                else:
+                    i += 1
+        
+        elif value == 'order' and i + 1 < n and tokens[i + 1] == ('kw', 'by'):
+            i += 2
+            while i < n and not (tokens[i][0] == 'kw' and tokens[i][1] == 'limit'):
+                kind, value = tokens[i]
+                if kind in ('comma',) or (kind == 'kw' and value in ('asc', 'desc')):
+                    i += 1
+                    continue
+                if kind != 'ident':
+                    break
+                if '.' in value:
+                    table_alias, column_name = value.split('.')[:2]
+                    table_name = alias_to_table.get(table_alias)
                     if table_name:
-                        potential_indexes.append({
-                            "table": table_name,
-                            "columns": [column_name],
-                            "reason": "Equality condition in WHERE clause"
-                        })
+                        _add(table_name, [column_name], "ORDER BY clause")
                 else:
                     # Column without table reference - try to match to all tables
                     for table in tables:
-                        potential_indexes.append({
-                            "table": table["name"],
-                            "columns": [column_ref],
-                            "reason": "Possible equality condition in WHERE clause"
-                        })
-    
-    # Extract JOIN conditions
-    join_conditions = re.finditer(r'join\s+([a-z0-9_\.]+)(?:\s+(?:as\s+)?([a-z0-9_]+))?\s+on\s+(.+?)(?:(?:inner|left|right|outer)\s+join|where|group|having|order|limit|\$)', query_lower, re.DOTALL)
-    
-    for match in join_conditions:
-        table_name = match.group(1)
-        if '.' in table_name:
-            table_name = table_name.split('.')[-1]
+                        _add(table["name"], [value], "Possible ORDER BY column")
+                i += 1
         
-        join_condition = match.group(3).strip()
-        
-        # Look for equality join conditions
-        eq_match = re.search(r'([a-z0-9_\.]+)\s*=\s*([a-z0-9_\.]+)', join_condition)
-        if eq_match:
-            left_col = eq_match.group(1)
-            right_col = eq_match.group(2)
-            
-            # Check if either column belongs to this table
-            for col in [left_col, right_col]:
-                if '.' in col:
-                    parts = col.split('.')
-                    col_table_alias = parts[0]
-                    col_name = parts[1]
-                    
-                    # Find the actual table name from alias
-                    col_table_name = next((t["name"] for t in tables if t["alias"] == col_table_alias), None)
-                    
-                    if col_table_name == table_name:
-                        potential_indexes.append({
-                            "table": table_name,
-                            "columns": [col_name],
-                            "reason": "Join condition"
-                        })
-    
-    # Extract ORDER BY columns
-    order_by_match = re.search(r'order\s+by\s+(.+?)(?:limit|\$)', query_lower, re.DOTALL)
-    
-    if order_by_match:
-        order_clause = order_by_match.group(1).strip()
-        order_cols = re.split(r',', order_clause)
-        
-        for col in order_cols:
-            col = col.strip().split()[0]  # Remove ASC/DESC if present
-            
-            if '.' in col:
-                parts = col.split('.')
-                table_alias = parts[0]
-                column_name = parts[1]
-                
-                # Find the actual table name from alias
-                table_name = next((t["name"] for t in tables if t["alias"] == table_alias), None)
-                
-                if table_name:
-                    potential_indexes.append({
-                        "table": table_name,
-                        "columns": [column_name],
-                        "reason": "ORDER BY clause"
-                    })
-            else:
-                # Column without table reference - try to match to all tables
-                for table in tables:
-                    potential_indexes.append({
-                        "table": table["name"],
-                        "columns": [col],
-                        "reason": "Possible ORDER BY column"
-                    })
-    
-    # Extract GROUP BY columns
-    group_by_match = re.search(r'group\s+by\s+(.+?)(?:having|order|limit|\$)', query_lower, re.DOTALL)
-    
-    if group_by_match:
-        group_clause = group_by_match.group(1).strip()
-        group_cols = re.split(r',', group_clause)
+        elif value == 'group' and i + 1 < n and tokens[i + 1] == ('kw', 'by'):
+            i += 2
+            while i < n and not (tokens[i][0] == 'kw' and tokens[i][1] in ('having', 'order', 'limit')):
+                kind, value = tokens[i]
+                if kind == 'comma':
+                    i += 1
+                    continue
+                if kind != 'ident':
+                    break
+                if '.' in value:
+                    table_alias, column_name = value.split('.')[:2]
+                    table_name = alias_to_table.get(table_alias)
+                    if table_name:
+                        _add(table_name, [column_name], "GROUP BY clause")
+                else:
+                    # Column without table reference - try to match to all tables
+                    for table in tables:
+                        _add(table["name"], [value], "Possible GROUP BY column")
+                i += 1
         
-        for col in group_cols:
-            col = col.strip()
-            
-            if '.' in col:
-                parts = col.split('.')
-                table_alias = parts[0]
-                column_name = parts[1]
-                
-                # Find the actual table name from alias
-                table_name = next((t["name"] for t in tables if t["alias"] == table_alias), None)
-                
-                if table_name:
-                    potential_indexes.append({
-                        "table": table_name,
-                        "columns": [column_name],
-                        "reason": "GROUP BY clause"
-                    })
-            else:
-                # Column without table reference - try to match to all tables
-                for table in tables:
-                    potential_indexes.append({
-                        "table": table["name"],
-                        "columns": [col],
-                        "reason": "Possible GROUP BY column"
-                    })
+        else:
+            i += 1
     
-    return potential_indexes
+    return tuple(candidates.values())
+
+def clear_cache() -> None:
+    """Clear the memoized candidate-extraction results"""
+    _extract_potential_indexes.cache_clear()
 
 def get_table_structure_for_index(connector: MySQLConnector, tables: List[str]) -> Dict[str, Any]:
     """
@@ -190,56 +294,86 @@ def get_table_structure_for_index(connector: MySQLConnector, tables: List[str])
     Returns:
         Dict with table structure information
     """
-    result = {}
+    if not tables:
+        return {}
+
+    # Same TTL cache the query-analysis getters use; schema moves on the
+    # scale of minutes, so repeat recommendations skip all three queries
+    cache_key = ("index_structure", connector.cache_scope, frozenset(tables))
+    cached = _metadata_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = {table: {"columns": [], "indexes": [], "stats": {}} for table in tables}
     
-    for table in tables:
-        # Get columns
-        columns_query = f"""
-            SELECT 
-                column_name,
-                column_type,
-                is_nullable,
-                column_key
-            FROM 
-                information_schema.columns
-            WHERE 
-                table_schema = DATABASE()
-                AND table_name = '{table}'
-            ORDER BY 
-                ordinal_position
-        """
-        columns = connector.execute_query(columns_query)
-        
-        # Get indexes
-        indexes_query = f"""
-            SELECT 
-                index_name,
-                GROUP_CONCAT(column_name ORDER BY seq_in_index) as columns,
-                index_type,
-                non_unique
-            FROM 
-                information_schema.statistics
-            WHERE 
-                table_schema = DATABASE()
-                AND table_name = '{table}'
-            GROUP BY 
-                index_name, index_type, non_unique
-        """
-        indexes = connector.execute_query(indexes_query)
-        
-        # Get table stats
-        stats_query = f"SHOW TABLE STATUS LIKE '{table}'"
-        stats = connector.execute_query(stats_query)
-        
-        result[table] = {
-            "columns": columns,
-            "indexes": indexes,
-            "stats": stats[0] if stats else {}
-        }
+    # One round trip per query kind instead of three per table, with the
+    # table names bound as parameters rather than interpolated into the SQL.
+    placeholders = ", ".join(["%s"] * len(tables))
     
+    # Get columns
+    columns_query = f"""
+        SELECT 
+            table_name,
+            column_name,
+            column_type,
+            is_nullable,
+            column_key
+        FROM 
+            information_schema.columns
+        WHERE 
+            table_schema = DATABASE()
+            AND table_name IN ({placeholders})
+        ORDER BY 
+            table_name, ordinal_position
+    """
+    for row in connector.execute_query(columns_query, tables):
+        result[row["table_name"]]["columns"].append(row)
+    
+    # Get indexes
+    indexes_query = f"""
+        SELECT 
+            table_name,
+            index_name,
+            GROUP_CONCAT(column_name ORDER BY seq_in_index) as columns,
+            index_type,
+            non_unique
+        FROM 
+            information_schema.statistics
+        WHERE 
+            table_schema = DATABASE()
+            AND table_name IN ({placeholders})
+        GROUP BY 
+            table_name, index_name, index_type, non_unique
+    """
+    for row in connector.execute_query(indexes_query, tables):
+        # Split the GROUP_CONCAT column list once here so the matching loop
+        # in check_existing_indexes never re-splits the same CSV string
+        row["columns_list"] = row["columns"].split(",")
+        row["columns_tuple"] = tuple(row["columns_list"])
+        result[row["table_name"]]["indexes"].append(row)
+    
+    # Get table stats (information_schema equivalent of SHOW TABLE STATUS,
+    # aliased to the SHOW column names the formatters expect)
+    stats_query = f"""
+        SELECT 
+            table_name,
+            engine AS Engine,
+            table_rows AS `Rows`,
+            data_length AS Data_length,
+            index_length AS Index_length
+        FROM 
+            information_schema.tables
+        WHERE 
+            table_schema = DATABASE()
+            AND table_name IN ({placeholders})
+    """
+    for row in connector.execute_query(stats_query, tables):
+        result[row["table_name"]]["stats"] = row
+
+    _metadata_cache.set(cache_key, result)
     return result
 
-def check_existing_indexes(potential_indexes: List[Dict[str, Any]], db_structure: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+def check_existing_indexes(potential_indexes: List[PotentialIndex], db_structure: Dict[str, Any]) -> Tuple[List[MatchedIndex], List[PotentialIndex]]:
     """
     Check which potential indexes already exist
     
@@ -253,39 +387,65 @@ def check_existing_indexes(potential_indexes: List[Dict[str, Any]], db_structure
     existing = []
     missing = []
     
+    # Index the existing indexes by (table, first column) so the prefix check
+    # per candidate is a hash lookup plus one tuple compare instead of a scan
+    # over every index on the table.
+    prefix_map: Dict[str, Dict[str, List[Tuple[Tuple[str, ...], str]]]] = {}
+    for table, structure in db_structure.items():
+        table_map = prefix_map.setdefault(table, {})
+        for existing_index in structure["indexes"]:
+            existing_columns = existing_index.get("columns_tuple") or tuple(existing_index["columns"].split(","))
+            if existing_columns:
+                table_map.setdefault(existing_columns[0], []).append(
+                    (existing_columns, existing_index["index_name"])
+                )
+    
     for index in potential_indexes:
-        table = index["table"]
-        columns = index["columns"]
+        table = index.table
+        columns = index.columns
         
         # Skip if table doesn't exist in our structure
         if table not in db_structure:
             continue
         
         # Check if this index already exists
+        # Note: Order matters for MySQL indexes, so we check if our columns
+        # are a prefix of an existing index
         found = False
-        for existing_index in db_structure[table]["indexes"]:
-            existing_columns = existing_index["columns"].split(",")
-            
-            # Check if all columns in our potential index are covered by this existing index
-            # Note: Order matters for MySQL indexes, so we check if our columns are a prefix of the existing index
-            if len(columns) <= len(existing_columns):
-                if all(columns[i] == existing_columns[i] for i in range(len(columns))):
-                    found = True
-                    existing.append({
-                        "table": table,
-                        "columns": columns,
-                        "existing_index": existing_index["index_name"],
-                        "reason": index["reason"]
-                    })
-                    break
+        candidates = prefix_map[table].get(columns[0], ()) if columns else ()
+        for existing_columns, index_name in candidates:
+            if existing_columns[:len(columns)] == columns:
+                found = True
+                existing.append(MatchedIndex(table, columns, index_name, index.reason))
+                break
         
         if not found:
             missing.append(index)
     
     return existing, missing
 
+# Markdown skeletons for the per-table sections, built once at import and
+# filled with a single format_map per table
+_STATS_TMPL = (
+    "#### Statistics\n\n"
+    "- **Engine**: {engine}\n"
+    "- **Rows (approx)**: {rows}\n"
+    "- **Data Size**: {data}\n"
+    "- **Index Size**: {idx}\n\n"
+)
+_COLUMNS_HEADER = (
+    "#### Columns\n\n"
+    "| Column | Type | Nullable | Key |\n"
+    "| ------ | ---- | -------- | --- |\n"
+)
+_INDEXES_HEADER = (
+    "#### Existing Indexes\n\n"
+    "| Name | Columns | Type | Unique |\n"
+    "| ---- | ------- | ---- | ------ |\n"
+)
+
 def format_index_recommendations_response(query: str, plan_json: Dict[str, Any], db_structure: Dict[str, Any],
-                                         existing_indexes: List[Dict[str, Any]], missing_indexes: List[Dict[str, Any]]) -> str:
+                                         existing_indexes: List[MatchedIndex], missing_indexes: List[PotentialIndex]) -> str:
     """
     Format index recommendations as a response
     
@@ -299,140 +459,116 @@ def format_index_recommendations_response(query: str, plan_json: Dict[str, Any],
     Returns:
         Formatted string with recommendations
     """
-    response = "# MySQL Index Recommendations\n\n"
+    # Build the response as a list of fragments and join once at the end;
+    # repeated string += is quadratic in the response size.
+    parts = ["# MySQL Index Recommendations\n\n"]
     
     # Original query
-    response += "## Original Query\n\n"
-    response += f"```sql\n{query}\n```\n\n"
+    parts.append("## Original Query\n\n")
+    parts.append(f"```sql\n{query}\n```\n\n")
     
     # Execution plan summary
-    response += "## Execution Plan Summary\n\n"
+    parts.append("## Execution Plan Summary\n\n")
     
     try:
-        # Extract key information from the plan
-        if "query_block" in plan_json:
-            query_block = plan_json["query_block"]
-            
-            # Check for table scans
-            table_scans = []
-            if "table" in query_block:
-                tables = query_block["table"]
-                if isinstance(tables, dict):
-                    tables = [tables]
-                
-                for table in tables:
-                    access_type = table.get("access_type", "")
-                    if access_type == "ALL":
-                        table_scans.append(table.get("table_name", "Unknown"))
-            
-            if table_scans:
-                response += "### Full Table Scans Detected\n\n"
-                response += "The following tables are being scanned without using indexes:\n\n"
-                for table in table_scans:
-                    response += f"- `{table}`\n"
-                response += "\n"
-            
-            # Check for temporary tables
-            if "temporary_table" in query_block:
-                response += "### Temporary Table Used\n\n"
-                response += "The query creates a temporary table, which might benefit from better indexing.\n\n"
-            
-            # Check for filesorts
-            if "ordering_operation" in query_block:
-                response += "### Filesort Used\n\n"
-                response += "The query uses a filesort operation, which could be optimized with proper indexes on ORDER BY columns.\n\n"
+        # Extract key information from the plan in one walk
+        table_scans = []
+        uses_temporary_table = False
+        uses_filesort = False
+        for kind, payload in iter_plan_events(plan_json):
+            if kind == "table_scan":
+                table_scans.append(payload)
+            elif kind == "temporary_table":
+                uses_temporary_table = True
+            elif kind == "filesort":
+                uses_filesort = True
+        
+        if table_scans:
+            parts.append("### Full Table Scans Detected\n\n")
+            parts.append("The following tables are being scanned without using indexes:\n\n")
+            for table in table_scans:
+                parts.append(f"- `{table}`\n")
+            parts.append("\n")
+        
+        if uses_temporary_table:
+            parts.append("### Temporary Table Used\n\n")
+            parts.append("The query creates a temporary table, which might benefit from better indexing.\n\n")
+        
+        if uses_filesort:
+            parts.append("### Filesort Used\n\n")
+            parts.append("The query uses a filesort operation, which could be optimized with proper indexes on ORDER BY columns.\n\n")
     except Exception as e:
-        response += f"Error analyzing execution plan: {str(e)}\n\n"
+        parts.append(f"Error analyzing execution plan: {str(e)}\n\n")
     
     # Existing indexes
     if existing_indexes:
-        response += "## Existing Indexes That Match Query Needs\n\n"
-        response += "| Table | Columns | Existing Index | Reason |\n"
-        response += "| ----- | ------- | -------------- | ------ |\n"
-        
-        for index in existing_indexes:
-            columns_str = ", ".join(index["columns"])
-            response += f"| {index['table']} | {columns_str} | {index['existing_index']} | {index['reason']} |\n"
-        
-        response += "\n"
+        parts.append("## Existing Indexes That Match Query Needs\n\n")
+        parts.append("| Table | Columns | Existing Index | Reason |\n")
+        parts.append("| ----- | ------- | -------------- | ------ |\n")
+        parts.append("\n".join(
+            f"| {index.table} | {', '.join(index.columns)} | {index.existing_index} | {index.reason} |"
+            for index in existing_indexes
+        ))
+        parts.append("\n\n")
     
     # Missing indexes
     if missing_indexes:
-        response += "## Recommended New Indexes\n\n"
-        response += "| Table | Columns | Reason | SQL |\n"
-        response += "| ----- | ------- | ------ | --- |\n"
+        parts.append("## Recommended New Indexes\n\n")
+        parts.append("| Table | Columns | Reason | SQL |\n")
+        parts.append("| ----- | ------- | ------ | --- |\n")
         
+        rows = []
         for index in missing_indexes:
-            columns_str = ", ".join(index["columns"])
-            index_name = f"idx_{index['table']}_{'_'.join(index['columns'])}"
-            create_sql = f"CREATE INDEX {index_name} ON {index['table']} ({columns_str});"
-            
-            response += f"| {index['table']} | {columns_str} | {index['reason']} | `{create_sql}` |\n"
-        
-        response += "\n"
+            columns_str = ", ".join(index.columns)
+            index_name = f"idx_{index.table}_{'_'.join(index.columns)}"
+            create_sql = f"CREATE INDEX {index_name} ON {index.table} ({columns_str});"
+            rows.append(f"| {index.table} | {columns_str} | {index.reason} | `{create_sql}` |")
+        parts.append("\n".join(rows))
+        parts.append("\n\n")
     else:
-        response += "## No New Indexes Recommended\n\n"
-        response += "The query appears to be using existing indexes effectively, or no clear index candidates were identified.\n\n"
+        parts.append("## No New Indexes Recommended\n\n")
+        parts.append("The query appears to be using existing indexes effectively, or no clear index candidates were identified.\n\n")
     
     # Table structure information
-    response += "## Table Structure Information\n\n"
+    parts.append("## Table Structure Information\n\n")
     
     for table_name, structure in db_structure.items():
-        response += f"### {table_name}\n\n"
+        parts.append(f"### {table_name}\n\n")
         
         # Table stats
         stats = structure["stats"]
         if stats:
-            response += "#### Statistics\n\n"
-            response += f"- **Engine**: {stats.get('Engine', 'Unknown')}\n"
-            response += f"- **Rows (approx)**: {stats.get('Rows', 'Unknown')}\n"
-            response += f"- **Data Size**: {format_bytes(stats.get('Data_length', 0))}\n"
-            response += f"- **Index Size**: {format_bytes(stats.get('Index_length', 0))}\n\n"
+            parts.append(_STATS_TMPL.format_map({
+                "engine": stats.get("Engine", "Unknown"),
+                "rows": stats.get("Rows", "Unknown"),
+                "data": format_bytes(stats.get("Data_length", 0)),
+                "idx": format_bytes(stats.get("Index_length", 0)),
+            }))
         
         # Columns
         columns = structure["columns"]
         if columns:
-            response += "#### Columns\n\n"
-            response += "| Column | Type | Nullable | Key |\n"
-            response += "| ------ | ---- | -------- | --- |\n"
-            
-            for column in columns:
-                nullable = "YES" if column["is_nullable"] == "YES" else "NO"
-                key = column["column_key"] or ""
-                
-                response += f"| {column['column_name']} | {column['column_type']} | {nullable} | {key} |\n"
-            
-            response += "\n"
+            parts.append(_COLUMNS_HEADER)
+            parts.append("\n".join(
+                f"| {column['column_name']} | {column['column_type']} | "
+                f"{'YES' if column['is_nullable'] == 'YES' else 'NO'} | {column['column_key'] or ''} |"
+                for column in columns
+            ))
+            parts.append("\n\n")
         
         # Existing indexes
         indexes = structure["indexes"]
         if indexes:
-            response += "#### Existing Indexes\n\n"
-            response += "| Name | Columns | Type | Unique |\n"
-            response += "| ---- | ------- | ---- | ------ |\n"
-            
-            for index in indexes:
-                unique = "No" if index["non_unique"] == 1 else "Yes"
-                
-                response += f"| {index['index_name']} | {index['columns']} | {index['index_type']} | {unique} |\n"
-            
-            response += "\n"
+            parts.append(_INDEXES_HEADER)
+            parts.append("\n".join(
+                f"| {index['index_name']} | {index['columns']} | {index['index_type']} | "
+                f"{'No' if index['non_unique'] == 1 else 'Yes'} |"
+                for index in indexes
+            ))
+            parts.append("\n\n")
     
     # Additional recommendations
-    response += "## Additional Recommendations\n\n"
+    parts.append("## Additional Recommendations\n\n")
     # This section will be filled by the model based on the data provided
     
-    return response
-
-def format_bytes(bytes_value):
-    """Format bytes to human-readable format"""
-    if bytes_value is None:
-        return "Unknown"
-    
-    bytes_value = float(bytes_value)
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if bytes_value < 1024:
-            return f"{bytes_value:.2f} {unit}"
-        bytes_value /= 1024
-    
-    return f"{bytes_value:.2f} PB"
+    return "".join(parts)
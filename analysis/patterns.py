@@ -1,9 +1,91 @@
 """
 Functions for detecting MySQL query patterns and anti-patterns
 """
+import json
 import re
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, Dict, Any, Tuple, Optional
 
+try:
+    import ahocorasick  # optional C-extension for multi-keyword scanning
+except ImportError:
+    ahocorasick = None
+
+# Whitespace normalizer used to build cache keys: the analyzers are pure over
+# the query text, so queries differing only in case/whitespace share a result.
+_WS = re.compile(r'\s+')
+
+@lru_cache(maxsize=128)
+def _lower(query: str) -> str:
+    """
+    Cached lowercase view of a query.
+
+    The analysis pipeline typically lowercases the same SQL text in several
+    functions per request; caching makes the copies after the first free.
+    """
+    return query.lower()
+
+# EXPLAIN FORMAT=JSON key names used by the plan walker, hoisted so each is
+# loaded once as a shared constant rather than rebuilt per lookup site
+_QUERY_BLOCK = "query_block"
+_TABLE = "table"
+_TABLE_NAME = "table_name"
+_ACCESS_TYPE = "access_type"
+_ACCESS_ALL = "ALL"
+_TEMPORARY_TABLE = "temporary_table"
+_ORDERING_OPERATION = "ordering_operation"
+_NESTED_LOOP = "nested_loop"
+
+# detect_query_patterns takes a dict (unhashable), so it gets a small
+# insertion-ordered cache keyed by the serialized plan instead of lru_cache.
+_PLAN_CACHE: "OrderedDict[str, Tuple[Dict[str, Any], ...]]" = OrderedDict()
+_PLAN_CACHE_MAXSIZE = 128
+
+# Keyword-style anti-pattern rules over the normalized query. With
+# pyahocorasick installed, all phrases are found in one automaton sweep;
+# otherwise each is a C-level substring test.
+_ANTI_PATTERN_KEYWORDS = (
+    'select * from',
+    'not in (',
+    'not exists',
+    'having',
+    'group by',
+    'order by rand(',
+)
+
+if ahocorasick is not None:
+    _AC_AUTOMATON = ahocorasick.Automaton()
+    for _kw in _ANTI_PATTERN_KEYWORDS:
+        _AC_AUTOMATON.add_word(_kw, _kw)
+    _AC_AUTOMATON.make_automaton()
+else:
+    _AC_AUTOMATON = None
+
+def _keyword_hits(query: str) -> set:
+    """Find which anti-pattern keywords occur in a normalized query"""
+    if _AC_AUTOMATON is not None:
+        return {kw for _, kw in _AC_AUTOMATON.iter(query)}
+    return {kw for kw in _ANTI_PATTERN_KEYWORDS if kw in query}
+
+# Precompiled anti-pattern checks. Most rules are plain substring tests on
+# the normalized (lowercased, whitespace-collapsed) query; regex is kept only
+# where match precision matters.
+_RE_LIKE_WILDCARD = re.compile(r'like\s+[\'"]%')
+_RE_FUNCTION_PATTERNS = (
+    re.compile(r'where\s+\w+\s*\([^)]+\)'),
+    re.compile(r'on\s+\w+\s*\([^)]+\)'),
+)
+_RE_IMPLICIT_CONVERSION = re.compile(r'where\s+\w+\s*=\s*[\'"][0-9]+[\'"]')
+
+# Read-only validation: one alternation scan over the query instead of one
+# regex pass per dangerous operation
+_ALLOWED_PREFIXES = ('select', 'show', 'explain', 'desc', 'describe')
+_RE_DANGEROUS_OPERATION = re.compile(
+    r'\b(insert|update|delete|drop|alter|create|truncate|'
+    r'grant|revoke|reset|load|optimize|repair|flush)\b'
+)
+
 def detect_query_patterns(plan_json: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Detect query patterns from execution plan
@@ -14,50 +96,91 @@ def detect_query_patterns(plan_json: Dict[str, Any]) -> List[Dict[str, Any]]:
     Returns:
         List of detected patterns
     """
-    patterns = []
+    key = json.dumps(plan_json, sort_keys=True)
+    cached = _PLAN_CACHE.get(key)
+    if cached is not None:
+        _PLAN_CACHE.move_to_end(key)
+        return [dict(pattern) for pattern in cached]
     
-    # Check for table scans
-    if "query_block" in plan_json and "table" in plan_json["query_block"]:
-        tables = plan_json["query_block"]["table"]
-        if isinstance(tables, dict):
-            tables = [tables]
-        
-        for table in tables:
-            access_type = table.get("access_type", "")
-            if access_type == "ALL":
-                patterns.append({
-                    "pattern": "Full Table Scan",
-                    "description": f"The query performs a full table scan on table '{table.get('table_name', 'Unknown')}'.",
-                    "recommendation": "Consider adding an index to the columns used in WHERE clauses."
-                })
-    
-    # Check for temporary tables
-    if "query_block" in plan_json and "temporary_table" in plan_json["query_block"]:
-        patterns.append({
-            "pattern": "Temporary Table",
-            "description": "The query creates a temporary table, which can be memory-intensive.",
-            "recommendation": "Consider simplifying the query or adding appropriate indexes."
-        })
-    
-    # Check for filesorts
-    if "query_block" in plan_json and "ordering_operation" in plan_json["query_block"]:
-        patterns.append({
-            "pattern": "Filesort",
-            "description": "The query uses a filesort operation, which can be slow for large datasets.",
-            "recommendation": "Consider adding an index that matches your ORDER BY clause."
-        })
+    patterns = _detect_query_patterns(plan_json)
+    _PLAN_CACHE[key] = tuple(patterns)
+    if len(_PLAN_CACHE) > _PLAN_CACHE_MAXSIZE:
+        _PLAN_CACHE.popitem(last=False)
+    return patterns
+
+def iter_plan_events(plan_json: Dict[str, Any]):
+    """
+    Walk an EXPLAIN FORMAT=JSON plan once, yielding normalized
+    (kind, payload) events.
+
+    Kinds: 'table_scan' and 'join_no_index' carry the table name as
+    payload; 'temporary_table' and 'filesort' carry None. Consumers
+    (pattern detection, response formatters) dispatch on the events
+    instead of each re-traversing the plan dict.
+    """
+    # Explicit stack walk over the whole plan tree, so tables inside
+    # subqueries, unions and ordering/grouping operations are seen too.
+    # The flag tracks whether a node sits under a nested_loop join, which
+    # decides table_scan vs join_no_index for ALL-access tables
+    stack = [(plan_json, False)]
+    while stack:
+        node, in_nested_loop = stack.pop()
+        if isinstance(node, list):
+            for item in reversed(node):
+                stack.append((item, in_nested_loop))
+            continue
+        if not isinstance(node, dict):
+            continue
+
+        if _TEMPORARY_TABLE in node:
+            yield "temporary_table", None
+        if _ORDERING_OPERATION in node:
+            yield "filesort", None
+
+        for key, value in node.items():
+            if key == _TABLE:
+                tables = value if isinstance(value, list) else [value]
+                for table in tables:
+                    if not isinstance(table, dict):
+                        continue
+                    if table.get(_ACCESS_TYPE, "") == _ACCESS_ALL:
+                        kind = "join_no_index" if in_nested_loop else "table_scan"
+                        yield kind, table.get(_TABLE_NAME, "Unknown")
+                    stack.append((table, False))
+            elif key == _NESTED_LOOP:
+                stack.append((value, True))
+            elif isinstance(value, (dict, list)):
+                stack.append((value, False))
+
+def _detect_query_patterns(plan_json: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Uncached execution-plan pattern detection"""
+    patterns = []
     
-    # Check for joins without indexes
-    if "query_block" in plan_json and "nested_loop" in plan_json["query_block"]:
-        nested_loops = plan_json["query_block"]["nested_loop"]
-        if isinstance(nested_loops, list):
-            for loop in nested_loops:
-                if "table" in loop and loop["table"].get("access_type") == "ALL":
-                    patterns.append({
-                        "pattern": "Join Without Index",
-                        "description": f"The query joins with table '{loop['table'].get('table_name', 'Unknown')}' without using an index.",
-                        "recommendation": "Add an index to the join columns in this table."
-                    })
+    for kind, payload in iter_plan_events(plan_json):
+        if kind == "table_scan":
+            patterns.append({
+                "pattern": "Full Table Scan",
+                "description": f"The query performs a full table scan on table '{payload}'.",
+                "recommendation": "Consider adding an index to the columns used in WHERE clauses."
+            })
+        elif kind == "temporary_table":
+            patterns.append({
+                "pattern": "Temporary Table",
+                "description": "The query creates a temporary table, which can be memory-intensive.",
+                "recommendation": "Consider simplifying the query or adding appropriate indexes."
+            })
+        elif kind == "filesort":
+            patterns.append({
+                "pattern": "Filesort",
+                "description": "The query uses a filesort operation, which can be slow for large datasets.",
+                "recommendation": "Consider adding an index that matches your ORDER BY clause."
+            })
+        elif kind == "join_no_index":
+            patterns.append({
+                "pattern": "Join Without Index",
+                "description": f"The query joins with table '{payload}' without using an index.",
+                "recommendation": "Add an index to the join columns in this table."
+            })
     
     return patterns
 
@@ -71,11 +194,17 @@ def detect_query_anti_patterns(query: str) -> List[Dict[str, Any]]:
     Returns:
         List of detected anti-patterns
     """
-    query_lower = query.lower()
+    key = _WS.sub(' ', _lower(query)).strip()
+    return [dict(anti_pattern) for anti_pattern in _detect_query_anti_patterns(key)]
+
+@lru_cache(maxsize=512)
+def _detect_query_anti_patterns(query: str) -> Tuple[Dict[str, Any], ...]:
+    """Uncached anti-pattern detection over a normalized query"""
     anti_patterns = []
-    
+    hits = _keyword_hits(query)
+
     # Check for SELECT *
-    if re.search(r'select\s+\*\s+from', query_lower):
+    if 'select * from' in hits:
         anti_patterns.append({
             "issue": "SELECT *",
             "description": "Using SELECT * retrieves all columns, which can be inefficient when you only need specific columns.",
@@ -84,7 +213,7 @@ def detect_query_anti_patterns(query: str) -> List[Dict[str, Any]]:
         })
     
     # Check for LIKE with leading wildcard
-    if re.search(r'like\s+[\'"]%', query_lower):
+    if _RE_LIKE_WILDCARD.search(query):
         anti_patterns.append({
             "issue": "LIKE with Leading Wildcard",
             "description": "Using LIKE with a leading wildcard (%) prevents the use of indexes.",
@@ -93,13 +222,8 @@ def detect_query_anti_patterns(query: str) -> List[Dict[str, Any]]:
         })
     
     # Check for functions on indexed columns
-    function_patterns = [
-        r'where\s+\w+$[^)]+$',
-        r'on\s+\w+$[^)]+$'
-    ]
-    
-    for pattern in function_patterns:
-        if re.search(pattern, query_lower):
+    for pattern in _RE_FUNCTION_PATTERNS:
+        if pattern.search(query):
             anti_patterns.append({
                 "issue": "Function on Indexed Column",
                 "description": "Using functions on columns in WHERE or JOIN conditions prevents the use of indexes.",
@@ -107,8 +231,8 @@ def detect_query_anti_patterns(query: str) -> List[Dict[str, Any]]:
                 "example": "SELECT * FROM users WHERE YEAR(created_at) = 2023 -- Bad\nSELECT * FROM users WHERE created_at BETWEEN '2023-01-01' AND '2023-12-31' -- Good"
             })
     
-    # Check for OR conditions
-    if re.search(r'where.*?\s+or\s+', query_lower):
+    # Check for OR conditions (after a WHERE clause)
+    if ' or ' in query.partition(' where ')[2]:
         anti_patterns.append({
             "issue": "OR Conditions",
             "description": "OR conditions can prevent the use of indexes in some cases.",
@@ -117,7 +241,7 @@ def detect_query_anti_patterns(query: str) -> List[Dict[str, Any]]:
         })
     
     # Check for implicit conversions
-    if re.search(r'where\s+\w+\s*=\s*[\'"][0-9]+[\'"]', query_lower):
+    if _RE_IMPLICIT_CONVERSION.search(query):
         anti_patterns.append({
             "issue": "Implicit Type Conversion",
             "description": "Comparing a numeric column to a string value causes implicit type conversion and prevents index usage.",
@@ -126,7 +250,7 @@ def detect_query_anti_patterns(query: str) -> List[Dict[str, Any]]:
         })
     
     # Check for NOT IN or NOT EXISTS
-    if re.search(r'not\s+in\s*$', query_lower) or re.search(r'not\s+exists', query_lower):
+    if 'not in (' in hits or 'not exists' in hits:
         anti_patterns.append({
             "issue": "NOT IN or NOT EXISTS",
             "description": "NOT IN and NOT EXISTS can be inefficient, especially with large subqueries.",
@@ -135,7 +259,7 @@ def detect_query_anti_patterns(query: str) -> List[Dict[str, Any]]:
         })
     
     # Check for HAVING without GROUP BY
-    if re.search(r'having', query_lower) and not re.search(r'group\s+by', query_lower):
+    if 'having' in hits and 'group by' not in hits:
         anti_patterns.append({
             "issue": "HAVING without GROUP BY",
             "description": "Using HAVING without GROUP BY treats the entire result set as one group, which may not be intended.",
@@ -144,7 +268,7 @@ def detect_query_anti_patterns(query: str) -> List[Dict[str, Any]]:
         })
     
     # Check for ORDER BY RAND()
-    if re.search(r'order\s+by\s+rand$$', query_lower):
+    if 'order by rand(' in hits:
         anti_patterns.append({
             "issue": "ORDER BY RAND()",
             "description": "ORDER BY RAND() is extremely inefficient as it requires sorting the entire result set.",
@@ -152,7 +276,12 @@ def detect_query_anti_patterns(query: str) -> List[Dict[str, Any]]:
             "example": "-- Instead of:\nSELECT * FROM products ORDER BY RAND() LIMIT 5\n\n-- Consider:\nSELECT * FROM products WHERE id >= (SELECT FLOOR(RAND() * (SELECT MAX(id) FROM products))) ORDER BY id LIMIT 5"
         })
     
-    return anti_patterns
+    return tuple(anti_patterns)
+
+def clear_cache() -> None:
+    """Clear the memoized pattern and anti-pattern results"""
+    _PLAN_CACHE.clear()
+    _detect_query_anti_patterns.cache_clear()
 
 def validate_read_only_query(query: str) -> Tuple[bool, Optional[str]]:
     """
@@ -164,31 +293,20 @@ def validate_read_only_query(query: str) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    query_lower = query.lower().strip()
+    query_lower = _lower(query).strip()
     
-    # List of allowed query types
-    allowed_prefixes = [
-        'select', 'show', 'explain', 'desc', 'describe'
-    ]
-    
-    # Check if query starts with allowed prefix
-    if not any(query_lower.startswith(prefix) for prefix in allowed_prefixes):
+    # Check if query starts with an allowed read-only prefix
+    if not query_lower.startswith(_ALLOWED_PREFIXES):
         return False, "Only SELECT, SHOW, EXPLAIN, and DESCRIBE queries are allowed in read-only mode."
     
-    # Check for potentially dangerous operations
-    dangerous_operations = [
-        'insert', 'update', 'delete', 'drop', 'alter', 'create', 'truncate', 
-        'grant', 'revoke', 'reset', 'load', 'optimize', 'repair', 'flush'
-    ]
-    
-    # Look for dangerous operations in the query
-    for op in dangerous_operations:
-        pattern = r'\b' + op + r'\b'
-        if re.search(pattern, query_lower):
-            return False, f"The query contains a potentially dangerous operation: {op.upper()}"
+    # Look for dangerous operations anywhere in the query
+    match = _RE_DANGEROUS_OPERATION.search(query_lower)
+    if match:
+        return False, f"The query contains a potentially dangerous operation: {match.group(1).upper()}"
     
-    # Check for multi-statement queries
-    if ';' in query_lower[:-1]:  # Allow semicolon at the end
+    # Check for multi-statement queries; a single trailing semicolon is
+    # allowed, and counting avoids copying the query into a new slice
+    if query_lower.count(';') > (1 if query_lower.endswith(';') else 0):
         return False, "Multi-statement queries are not allowed."
     
     return True, None
\ No newline at end of file
@@ -2,47 +2,224 @@
 Functions for analyzing MySQL queries
 """
 import re
-import json
-from typing import Dict, List, Any, Optional
+import time
+from operator import itemgetter
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
 from db.connector import MySQLConnector
+from analysis.patterns import iter_plan_events
+from analysis.util import format_bytes
+
+# sqlglot gives correct table extraction (subqueries, CTEs, comma joins,
+# quoted identifiers); fall back to the regex path when it is not installed
+try:
+    import sqlglot
+    from sqlglot import exp as _sqlglot_exp
+except ImportError:
+    sqlglot = None
+
+# orjson serializes large EXPLAIN plans several times faster than stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _dumps_indent(obj) -> str:
+    """Pretty-print obj as 2-space-indented JSON, via orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    import json
+    return json.dumps(obj, indent=2)
+
+# Precompiled patterns for extract_tables_from_query, built once at import.
+# The comment patterns use negated character classes so matching stays linear
+# on unterminated comments instead of backtracking
+_RE_BLOCK_COMMENT = re.compile(r'/\*[^*]*(?:\*(?!/)[^*]*)*\*/')
+_RE_LINE_COMMENT = re.compile(r'--[^\n]*')
+_RE_WS = re.compile(r'\s+')
+# FROM and JOIN table references in one alternation so a single pass over
+# the query text collects both
+_RE_TABLE_REF = re.compile(r'(?:from|join)\s+([a-z0-9_\.`]+)(?:\s+as\s+[a-z0-9_]+)?')
+# String and numeric literals, for building structural query signatures
+_RE_LITERAL = re.compile(r"('[^']*'|\b\d+\b)")
+
+# Row-field getters for the formatter loops; itemgetter fetches all fields
+# of a row in one C call instead of one dict lookup per field
+_GET_COLUMN_ROW = itemgetter("column_name", "column_type", "is_nullable",
+                             "column_key", "column_default", "extra")
+_GET_INDEX_ROW = itemgetter("index_name", "columns", "index_type", "non_unique")
+
+def _signature(query: str) -> str:
+    """Structural signature of a query: comments stripped, literals replaced by ?, whitespace collapsed
+
+    Queries that differ only in literal values share a signature, so they
+    share cache entries below. Comments go first: collapsing whitespace
+    before stripping them would remove the newline that terminates a `--`
+    line comment, letting it swallow the rest of the query.
+    """
+    query = _RE_BLOCK_COMMENT.sub(' ', query)
+    query = _RE_LINE_COMMENT.sub(' ', query)
+    return _RE_LITERAL.sub('?', _RE_WS.sub(' ', query)).strip()
+
+class _MetadataCache:
+    """Small TTL cache for DB-backed table metadata
+
+    Entries expire after `ttl` seconds so schema changes are picked up;
+    the most recent hit is kept aside for a zero-lookup fast path.
+    """
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._last = None  # (key, value, expires) of the most recent hit
+
+    def get(self, key):
+        now = time.monotonic()
+        if self._last is not None and self._last[0] == key and self._last[2] > now:
+            return self._last[1]
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        self._last = (key, value, expires)
+        return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        self._last = (key, value, expires)
+
+    def clear(self):
+        self._data.clear()
+        self._last = None
+
+_metadata_cache = _MetadataCache()
 
 def extract_tables_from_query(query: str) -> List[str]:
     """
     Extract table names from a SQL query
-    
+
     Args:
         query: SQL query
-        
+
     Returns:
         List of table names
     """
+    return list(_extract_tables_from_signature(_signature(query)))
+
+@lru_cache(maxsize=1024)
+def _extract_tables_from_signature(query: str) -> tuple:
+    """Table extraction memoized on the structural signature"""
+    if sqlglot is not None:
+        try:
+            tree = sqlglot.parse_one(query, read="mysql")
+            # CTE names look like tables in the parse tree but are not real ones
+            cte_names = {cte.alias_or_name.lower() for cte in tree.find_all(_sqlglot_exp.CTE)}
+            tables = []
+            for table in tree.find_all(_sqlglot_exp.Table):
+                name = table.name.lower()
+                if name and name not in cte_names:
+                    tables.append(name)
+            return tuple(dict.fromkeys(tables))
+        except sqlglot.errors.ParseError:
+            pass  # Unparseable query; use the regex path below
+
+    return tuple(_extract_tables_regex(query))
+
+def _add_table(table: str, tables: List[str]) -> None:
+    """Normalize a captured table reference and append it to tables"""
+    table = table.strip('`')
+    if '.' in table:
+        schema, _, table = table.rpartition('.')
+        if schema == 'information_schema':
+            return  # Not a user table
+    if table and table != 'dual':
+        tables.append(table)
+
+def _extract_tables_regex(query: str) -> List[str]:
+    """Regex fallback for extract_tables_from_query"""
     # Normalize query
-    query = re.sub(r'/\*.*?\*/', ' ', query, flags=re.DOTALL)  # Remove comments
-    query = re.sub(r'--.*?(\n|\$)', ' ', query)  # Remove single line comments
-    query = re.sub(r'\s+', ' ', query)  # Normalize whitespace
+    query = _RE_BLOCK_COMMENT.sub(' ', query)  # Remove comments
+    query = _RE_LINE_COMMENT.sub(' ', query)  # Remove single line comments
+    query = ' '.join(query.split())  # Normalize whitespace (C-level, one pass)
     query = query.lower()  # Convert to lowercase
-    
-    # Find tables in FROM and JOIN clauses
+
+    # Find tables in FROM and JOIN clauses in one scan
     tables = []
-    
-    # Match FROM clause
-    from_matches = re.finditer(r'from\s+([a-z0-9_\.]+)(?:\s+as\s+[a-z0-9_]+)?', query)
-    for match in from_matches:
-        table = match.group(1)
-        if '.' in table:
-            table = table.split('.')[-1]  # Remove schema prefix
-        tables.append(table)
-    
-    # Match JOIN clauses
-    join_matches = re.finditer(r'join\s+([a-z0-9_\.]+)(?:\s+as\s+[a-z0-9_]+)?', query)
-    for match in join_matches:
-        table = match.group(1)
-        if '.' in table:
-            table = table.split('.')[-1]  # Remove schema prefix
-        tables.append(table)
-    
-    # Remove duplicates and return
-    return list(set(tables))
+    for match in _RE_TABLE_REF.finditer(query):
+        _add_table(match.group(1), tables)
+
+    # Dedupe while preserving first-seen order, so downstream cache keys
+    # and formatted output are deterministic
+    return list(dict.fromkeys(tables))
+
+# Metadata queries shared by the per-kind getters below and the batched
+# get_table_metadata helper; {placeholders} expands to the IN-clause %s list.
+# Table statistics: engine/create_time/update_time/collation live in
+# information_schema.tables too, so there is no need for a per-table
+# SHOW TABLE STATUS round-trip
+_TABLE_STATS_SQL = """
+        SELECT
+            table_name,
+            table_rows,
+            avg_row_length,
+            data_length,
+            index_length,
+            auto_increment,
+            engine,
+            create_time,
+            update_time,
+            table_collation AS collation
+        FROM
+            information_schema.tables
+        WHERE
+            table_schema = DATABASE()
+            AND table_name IN ({placeholders})
+    """
+
+_COLUMN_INFO_SQL = """
+        SELECT
+            table_name,
+            column_name,
+            column_type,
+            is_nullable,
+            column_key,
+            column_default,
+            extra
+        FROM
+            information_schema.columns
+        WHERE
+            table_schema = DATABASE()
+            AND table_name IN ({placeholders})
+        ORDER BY
+            table_name, ordinal_position
+    """
+
+_INDEX_INFO_SQL = """
+        SELECT
+            table_name,
+            index_name,
+            GROUP_CONCAT(column_name ORDER BY seq_in_index) as columns,
+            index_type,
+            non_unique
+        FROM
+            information_schema.statistics
+        WHERE
+            table_schema = DATABASE()
+            AND table_name IN ({placeholders})
+        GROUP BY
+            table_name, index_name, index_type, non_unique
+        ORDER BY
+            table_name, index_name
+    """
 
 def get_table_statistics(connector: MySQLConnector, tables: List[str]) -> List[Dict[str, Any]]:
     """
@@ -57,45 +234,20 @@ def get_table_statistics(connector: MySQLConnector, tables: List[str]) -> List[D
     """
     if not tables:
         return []
-    
-    # Format table names for IN clause
-    table_names = ', '.join([f"'{table}'" for table in tables])
-    
-    # Query for table statistics
-    query = f"""
-        SELECT 
-            table_name,
-            table_rows,
-            avg_row_length,
-            data_length,
-            index_length,
-            auto_increment
-        FROM 
-            information_schema.tables
-        WHERE 
-            table_schema = DATABASE()
-            AND table_name IN ({table_names})
-    """
-    
-    table_stats = connector.execute_query(query)
-    
-    # Get additional statistics from SHOW TABLE STATUS
-    for table in tables:
-        status_query = f"SHOW TABLE STATUS LIKE '{table}'"
-        status_result = connector.execute_query(status_query)
-        
-        if status_result:
-            # Find matching table in our results
-            for i, stat in enumerate(table_stats):
-                if stat["table_name"] == table:
-                    # Add additional info
-                    table_stats[i]["engine"] = status_result[0]["Engine"]
-                    table_stats[i]["create_time"] = status_result[0]["Create_time"]
-                    table_stats[i]["update_time"] = status_result[0]["Update_time"]
-                    table_stats[i]["collation"] = status_result[0]["Collation"]
-                    break
-    
-    return table_stats
+
+    cache_key = ("stats", connector.cache_scope, frozenset(tables))
+    cached = _metadata_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Placeholders for parameterized IN clause
+    placeholders = ', '.join(['%s'] * len(tables))
+
+    query = _TABLE_STATS_SQL.format(placeholders=placeholders)
+
+    result = connector.execute_prepared(query, tuple(tables))
+    _metadata_cache.set(cache_key, result)
+    return result
 
 def get_schema_information(connector: MySQLConnector, tables: List[str]) -> List[Dict[str, Any]]:
     """
@@ -110,30 +262,22 @@ def get_schema_information(connector: MySQLConnector, tables: List[str]) -> List
     """
     if not tables:
         return []
-    
-    # Format table names for IN clause
-    table_names = ', '.join([f"'{table}'" for table in tables])
-    
-    # Query for column information
-    query = f"""
-        SELECT 
-            table_name,
-            column_name,
-            column_type,
-            is_nullable,
-            column_key,
-            column_default,
-            extra
-        FROM 
-            information_schema.columns
-        WHERE 
-            table_schema = DATABASE()
-            AND table_name IN ({table_names})
-        ORDER BY 
-            table_name, ordinal_position
-    """
-    
-    return connector.execute_query(query)
+
+    cache_key = ("schema", connector.cache_scope, frozenset(tables))
+    cached = _metadata_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Placeholders for parameterized IN clause
+    placeholders = ', '.join(['%s'] * len(tables))
+
+    query = _COLUMN_INFO_SQL.format(placeholders=placeholders)
+
+    # information_schema.columns can be wide; stream rows instead of
+    # letting the driver buffer the whole result set first
+    result = list(connector.stream_query(query, tuple(tables)))
+    _metadata_cache.set(cache_key, result)
+    return result
 
 def get_index_information(connector: MySQLConnector, tables: List[str]) -> List[Dict[str, Any]]:
     """
@@ -148,30 +292,63 @@ def get_index_information(connector: MySQLConnector, tables: List[str]) -> List[
     """
     if not tables:
         return []
-    
-    # Format table names for IN clause
-    table_names = ', '.join([f"'{table}'" for table in tables])
-    
-    # Query for index information
-    query = f"""
-        SELECT 
-            table_name,
-            index_name,
-            GROUP_CONCAT(column_name ORDER BY seq_in_index) as columns,
-            index_type,
-            non_unique
-        FROM 
-            information_schema.statistics
-        WHERE 
-            table_schema = DATABASE()
-            AND table_name IN ({table_names})
-        GROUP BY 
-            table_name, index_name, index_type, non_unique
-        ORDER BY 
-            table_name, index_name
+
+    cache_key = ("indexes", connector.cache_scope, frozenset(tables))
+    cached = _metadata_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Placeholders for parameterized IN clause
+    placeholders = ', '.join(['%s'] * len(tables))
+
+    query = _INDEX_INFO_SQL.format(placeholders=placeholders)
+
+    result = list(connector.stream_query(query, tuple(tables)))
+    _metadata_cache.set(cache_key, result)
+    return result
+
+def get_table_metadata(connector: MySQLConnector, tables: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
-    
-    return connector.execute_query(query)
+    Get statistics, column and index information for the specified tables
+
+    Sends the three information_schema queries as one multi-statement batch,
+    so a cold cache costs a single round trip instead of three.
+
+    Args:
+        connector: MySQLConnector instance
+        tables: List of table names
+
+    Returns:
+        Tuple of (table statistics, column information, index information)
+    """
+    if not tables:
+        return [], [], []
+
+    keys = [(kind, connector.cache_scope, frozenset(tables))
+            for kind in ("stats", "schema", "indexes")]
+    cached = [_metadata_cache.get(key) for key in keys]
+    if all(rows is not None for rows in cached):
+        return tuple(cached)
+
+    placeholders = ', '.join(['%s'] * len(tables))
+    queries = [template.format(placeholders=placeholders)
+               for template in (_TABLE_STATS_SQL, _COLUMN_INFO_SQL, _INDEX_INFO_SQL)]
+    result_sets = connector.execute_multi(queries, tuple(tables) * 3)
+
+    if len(result_sets) != len(queries):
+        # Batch failed or came back short; fall back to the per-kind getters
+        return (get_table_statistics(connector, tables),
+                get_schema_information(connector, tables),
+                get_index_information(connector, tables))
+
+    for key, rows in zip(keys, result_sets):
+        _metadata_cache.set(key, rows)
+    return tuple(result_sets)
+
+def clear_cache():
+    """Clear the memoized table extraction and metadata caches"""
+    _extract_tables_from_signature.cache_clear()
+    _metadata_cache.clear()
 
 def format_query_analysis_response(query: str, plan_json: Dict[str, Any], tables_involved: List[str],
                                   table_stats: List[Dict[str, Any]], schema_info: List[Dict[str, Any]],
@@ -194,157 +371,163 @@ def format_query_analysis_response(query: str, plan_json: Dict[str, Any], tables
     Returns:
         Formatted string with analysis
     """
-    response = "# MySQL Query Analysis\n\n"
+    # Bucket metadata by table once so the per-table loop below does O(1)
+    # lookups instead of rescanning the full lists for every table.
+    # Callers may pass dicts already bucketed by table name (e.g. built
+    # while streaming rows), in which case they are used as-is
+    if isinstance(table_stats, dict):
+        stats_by_table = table_stats
+    else:
+        stats_by_table = {stat["table_name"]: stat for stat in table_stats}
+    if isinstance(schema_info, dict):
+        cols_by_table = schema_info
+    else:
+        cols_by_table = defaultdict(list)
+        for col in schema_info:
+            cols_by_table[col["table_name"]].append(col)
+    if isinstance(index_info, dict):
+        idx_by_table = index_info
+    else:
+        idx_by_table = defaultdict(list)
+        for idx in index_info:
+            idx_by_table[idx["table_name"]].append(idx)
+
+    parts = []
+    a = parts.append
+    a("# MySQL Query Analysis\n\n")
     
     # Original query
-    response += "## Original Query\n\n"
-    response += f"```sql\n{query}\n```\n\n"
+    a("## Original Query\n\n")
+    a(f"```sql\n{query}\n```\n\n")
     
     # Query complexity
-    response += "## Query Complexity Analysis\n\n"
-    response += f"- **Complexity Score**: {complexity['complexity_score']}\n"
-    response += f"- **Join Count**: {complexity['join_count']}\n"
-    response += f"- **Subquery Count**: {complexity['subquery_count']}\n"
-    response += f"- **Aggregation Count**: {complexity['aggregation_count']}\n"
+    a("## Query Complexity Analysis\n\n")
+    a(f"- **Complexity Score**: {complexity['complexity_score']}\n")
+    a(f"- **Join Count**: {complexity['join_count']}\n")
+    a(f"- **Subquery Count**: {complexity['subquery_count']}\n")
+    a(f"- **Aggregation Count**: {complexity['aggregation_count']}\n")
     
     if complexity['warnings']:
-        response += "- **Warnings**:\n"
+        a("- **Warnings**:\n")
         for warning in complexity['warnings']:
-            response += f"  - {warning}\n"
-    response += "\n"
+            a(f"  - {warning}\n")
+    a("\n")
     
     # Execution plan
-    response += "## Execution Plan\n\n"
-    response += "```json\n"
-    response += json.dumps(plan_json, indent=2)
-    response += "\n```\n\n"
+    a("## Execution Plan\n\n")
+    a("```json\n")
+    a(_dumps_indent(plan_json))
+    a("\n```\n\n")
     
     # Execution plan analysis
-    response += "### Execution Plan Analysis\n\n"
+    a("### Execution Plan Analysis\n\n")
     
-    # Extract key information from the plan
+    # Extract key information from the plan in a single walk over the
+    # tree, including nested query blocks
     try:
         plan_type = plan_json.get("query_block", {}).get("select_id", "Unknown")
-        response += f"- **Plan Type**: {plan_type}\n"
-        
-        # Check for table scans
+        a(f"- **Plan Type**: {plan_type}\n")
+
         table_scans = []
-        if "query_block" in plan_json and "table" in plan_json["query_block"]:
-            tables = plan_json["query_block"]["table"]
-            if isinstance(tables, dict):
-                tables = [tables]
-            
-            for table in tables:
-                access_type = table.get("access_type", "")
-                if access_type == "ALL":
-                    table_scans.append(table.get("table_name", "Unknown"))
-        
+        uses_temporary = False
+        uses_filesort = False
+        for kind, payload in iter_plan_events(plan_json):
+            if kind in ("table_scan", "join_no_index"):
+                table_scans.append(payload)
+            elif kind == "temporary_table":
+                uses_temporary = True
+            elif kind == "filesort":
+                uses_filesort = True
+
         if table_scans:
-            response += "- **Full Table Scans**:\n"
+            a("- **Full Table Scans**:\n")
             for table in table_scans:
-                response += f"  - `{table}`\n"
-        
-        # Check for temporary tables
-        if "query_block" in plan_json and "temporary_table" in plan_json["query_block"]:
-            response += "- **Uses Temporary Table**: Yes\n"
-        
-        # Check for filesorts
-        if "query_block" in plan_json and "ordering_operation" in plan_json["query_block"]:
-            response += "- **Uses Filesort**: Yes\n"
-    
+                a(f"  - `{table}`\n")
+
+        if uses_temporary:
+            a("- **Uses Temporary Table**: Yes\n")
+
+        if uses_filesort:
+            a("- **Uses Filesort**: Yes\n")
+
     except Exception as e:
-        response += f"Error parsing execution plan: {str(e)}\n"
+        a(f"Error parsing execution plan: {str(e)}\n")
     
-    response += "\n"
+    a("\n")
     
     # Tables involved
-    response += "## Tables Involved\n\n"
+    a("## Tables Involved\n\n")
     for table in tables_involved:
         # Find table stats
-        table_stat = next((stat for stat in table_stats if stat["table_name"] == table), None)
+        table_stat = stats_by_table.get(table)
         
         if table_stat:
-            response += f"### {table}\n\n"
-            response += f"- **Rows (approx)**: {table_stat.get('table_rows', 'Unknown')}\n"
-            response += f"- **Engine**: {table_stat.get('engine', 'Unknown')}\n"
+            a(f"### {table}\n\n")
+            a(f"- **Rows (approx)**: {table_stat.get('table_rows', 'Unknown')}\n")
+            a(f"- **Engine**: {table_stat.get('engine', 'Unknown')}\n")
             
             # Add data size if available
             if "data_length" in table_stat and table_stat["data_length"]:
                 data_size = format_bytes(table_stat["data_length"])
-                response += f"- **Data Size**: {data_size}\n"
+                a(f"- **Data Size**: {data_size}\n")
             
             # Add index size if available
             if "index_length" in table_stat and table_stat["index_length"]:
                 index_size = format_bytes(table_stat["index_length"])
-                response += f"- **Index Size**: {index_size}\n"
+                a(f"- **Index Size**: {index_size}\n")
             
-            response += "\n"
+            a("\n")
             
             # Add columns
-            table_columns = [col for col in schema_info if col["table_name"] == table]
+            table_columns = cols_by_table.get(table, [])
             if table_columns:
-                response += "#### Columns\n\n"
-                response += "| Column | Type | Nullable | Key | Default | Extra |\n"
-                response += "| ------ | ---- | -------- | --- | ------- | ----- |\n"
+                a("#### Columns\n\n")
+                a("| Column | Type | Nullable | Key | Default | Extra |\n")
+                a("| ------ | ---- | -------- | --- | ------- | ----- |\n")
                 
                 for column in table_columns:
-                    nullable = "YES" if column["is_nullable"] == "YES" else "NO"
-                    key = column["column_key"] or ""
-                    default = column["column_default"] or ""
-                    extra = column["extra"] or ""
-                    
-                    response += f"| {column['column_name']} | {column['column_type']} | {nullable} | {key} | {default} | {extra} |\n"
+                    name, col_type, nullable, key, default, extra = _GET_COLUMN_ROW(column)
+                    nullable = "YES" if nullable == "YES" else "NO"
+                    a(f"| {name} | {col_type} | {nullable} | {key or ''} | {default or ''} | {extra or ''} |\n")
                 
-                response += "\n"
+                a("\n")
             
             # Add indexes
-            table_indexes = [idx for idx in index_info if idx["table_name"] == table]
+            table_indexes = idx_by_table.get(table, [])
             if table_indexes:
-                response += "#### Indexes\n\n"
-                response += "| Name | Columns | Type | Unique |\n"
-                response += "| ---- | ------- | ---- | ------ |\n"
+                a("#### Indexes\n\n")
+                a("| Name | Columns | Type | Unique |\n")
+                a("| ---- | ------- | ---- | ------ |\n")
                 
                 for index in table_indexes:
-                    unique = "No" if index["non_unique"] == 1 else "Yes"
-                    response += f"| {index['index_name']} | {index['columns']} | {index['index_type']} | {unique} |\n"
+                    name, columns, idx_type, non_unique = _GET_INDEX_ROW(index)
+                    unique = "No" if non_unique == 1 else "Yes"
+                    a(f"| {name} | {columns} | {idx_type} | {unique} |\n")
                 
-                response += "\n"
+                a("\n")
     
     # Query patterns
     if patterns:
-        response += "## Detected Query Patterns\n\n"
+        a("## Detected Query Patterns\n\n")
         for pattern in patterns:
-            response += f"### {pattern['pattern']}\n\n"
-            response += f"{pattern['description']}\n\n"
+            a(f"### {pattern['pattern']}\n\n")
+            a(f"{pattern['description']}\n\n")
             if "recommendation" in pattern:
-                response += f"**Recommendation**: {pattern['recommendation']}\n\n"
+                a(f"**Recommendation**: {pattern['recommendation']}\n\n")
     
     # Query anti-patterns
     if anti_patterns:
-        response += "## Detected Query Anti-Patterns\n\n"
+        a("## Detected Query Anti-Patterns\n\n")
         for anti_pattern in anti_patterns:
-            response += f"### {anti_pattern['issue']}\n\n"
-            response += f"{anti_pattern['description']}\n\n"
+            a(f"### {anti_pattern['issue']}\n\n")
+            a(f"{anti_pattern['description']}\n\n")
             if "suggestion" in anti_pattern:
-                response += f"**Suggestion**: {anti_pattern['suggestion']}\n\n"
+                a(f"**Suggestion**: {anti_pattern['suggestion']}\n\n")
             if "example" in anti_pattern:
-                response += f"**Example**:\n```sql\n{anti_pattern['example']}\n```\n\n"
+                a(f"**Example**:\n```sql\n{anti_pattern['example']}\n```\n\n")
     
     # Optimization recommendations
-    response += "## Optimization Recommendations\n\n"
+    a("## Optimization Recommendations\n\n")
     # This section will be filled by the model based on the data provided
     
-    return response
-
-def format_bytes(bytes_value):
-    """Format bytes to human-readable format"""
-    if bytes_value is None:
-        return "Unknown"
-    
-    bytes_value = float(bytes_value)
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if bytes_value < 1024:
-            return f"{bytes_value:.2f} {unit}"
-        bytes_value /= 1024
-    
-    return f"{bytes_value:.2f} PB"
\ No newline at end of file
+    return "".join(parts)
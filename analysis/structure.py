@@ -1,8 +1,17 @@
 """
 Functions for analyzing MySQL database structure
 """
+import asyncio
+from operator import itemgetter
 from typing import Dict, List, Any
 from db.connector import MySQLConnector
+from analysis.util import format_bytes
+
+# Row-field getters for the formatter loops; itemgetter fetches all fields
+# of a row in one C call instead of one dict lookup per field
+_GET_COLUMN_ROW = itemgetter("column_name", "column_type", "is_nullable",
+                             "column_key", "column_default", "extra")
+_GET_INDEX_ROW = itemgetter("index_name", "columns", "index_type", "non_unique")
 
 def get_database_structure(connector: MySQLConnector) -> Dict[str, Any]:
     """
@@ -32,8 +41,6 @@ def get_database_structure(connector: MySQLConnector) -> Dict[str, Any]:
         ORDER BY 
             table_name
     """
-    tables = connector.execute_query(tables_query)
-    
     # Get columns for each table
     columns_query = """
         SELECT 
@@ -51,8 +58,6 @@ def get_database_structure(connector: MySQLConnector) -> Dict[str, Any]:
         ORDER BY 
             table_name, ordinal_position
     """
-    columns = connector.execute_query(columns_query)
-    
     # Get indexes
     indexes_query = """
         SELECT 
@@ -70,8 +75,6 @@ def get_database_structure(connector: MySQLConnector) -> Dict[str, Any]:
         ORDER BY 
             table_name, index_name
     """
-    indexes = connector.execute_query(indexes_query)
-    
     # Get foreign keys
     foreign_keys_query = """
         SELECT 
@@ -97,23 +100,106 @@ def get_database_structure(connector: MySQLConnector) -> Dict[str, Any]:
         ORDER BY 
             tc.table_name, kcu.column_name
     """
-    foreign_keys = connector.execute_query(foreign_keys_query)
-    
     # Get table statistics
     table_stats_query = """
         SHOW TABLE STATUS
     """
-    table_stats = connector.execute_query(table_stats_query)
-    
+    # Optimization findings, evaluated server-side so only the answers
+    # travel over the wire: tables without a primary key, tables with
+    # more than 5 indexes, and tables larger than 100 MB
+    no_pk_query = """
+        SELECT
+            t.table_name
+        FROM
+            information_schema.tables t
+        LEFT JOIN
+            information_schema.statistics s
+            ON s.table_schema = t.table_schema
+            AND s.table_name = t.table_name
+            AND s.index_name = 'PRIMARY'
+        WHERE
+            t.table_schema = DATABASE()
+            AND s.index_name IS NULL
+        ORDER BY
+            t.table_name
+    """
+    many_indexes_query = """
+        SELECT
+            table_name,
+            COUNT(DISTINCT index_name) AS index_count
+        FROM
+            information_schema.statistics
+        WHERE
+            table_schema = DATABASE()
+        GROUP BY
+            table_name
+        HAVING
+            index_count > 5
+        ORDER BY
+            table_name
+    """
+    large_tables_query = """
+        SELECT
+            table_name,
+            data_length
+        FROM
+            information_schema.tables
+        WHERE
+            table_schema = DATABASE()
+            AND data_length > 104857600
+        ORDER BY
+            table_name
+    """
+
+    # Send all queries as one multi-statement batch so the whole
+    # structure snapshot costs a single round-trip
+    queries = [tables_query, columns_query, indexes_query,
+               foreign_keys_query, table_stats_query,
+               no_pk_query, many_indexes_query, large_tables_query]
+    result_sets = connector.execute_multi(queries)
+
+    if len(result_sets) == len(queries):
+        (tables, columns, indexes, foreign_keys, table_stats,
+         tables_without_pk, tables_with_many_indexes, large_tables) = result_sets
+    else:
+        # Batch failed; fall back to issuing the queries serially
+        tables = connector.execute_query(tables_query)
+        columns = connector.execute_query(columns_query)
+        indexes = connector.execute_query(indexes_query)
+        foreign_keys = connector.execute_query(foreign_keys_query)
+        table_stats = connector.execute_query(table_stats_query)
+        tables_without_pk = connector.execute_query(no_pk_query)
+        tables_with_many_indexes = connector.execute_query(many_indexes_query)
+        large_tables = connector.execute_query(large_tables_query)
+
     # Return all collected information
     return {
         "tables": tables,
         "columns": columns,
         "indexes": indexes,
         "foreign_keys": foreign_keys,
-        "table_stats": table_stats
+        "table_stats": table_stats,
+        "tables_without_pk": tables_without_pk,
+        "tables_with_many_indexes": tables_with_many_indexes,
+        "large_tables": large_tables
     }
 
+async def get_database_structure_async(connector: MySQLConnector) -> Dict[str, Any]:
+    """
+    Async wrapper around get_database_structure
+
+    The snapshot itself already travels as one multi-statement batch, so the
+    remaining cost is the blocking driver call; running it in a worker thread
+    keeps the event loop free to serve other tool requests meanwhile.
+
+    Args:
+        connector: Connected MySQLConnector instance
+
+    Returns:
+        Dict containing database structure information
+    """
+    return await asyncio.to_thread(get_database_structure, connector)
+
 def organize_db_structure_by_table(db_structure: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
     """
     Organize database structure by table for easier analysis
@@ -162,33 +248,35 @@ def organize_db_structure_by_table(db_structure: Dict[str, Any]) -> Dict[str, Di
     
     return organized
 
-def analyze_database_structure_for_response(db_structure: Dict[str, Any]) -> str:
+def iter_structure_lines(db_structure: Dict[str, Any]):
     """
-    Analyze database structure and format as a response
-    
+    Yield the structure analysis Markdown chunk by chunk
+
+    Streaming callers can forward chunks as they are produced instead of
+    waiting for the whole schema to be formatted.
+
     Args:
         db_structure: Database structure from get_database_structure
-        
-    Returns:
-        Formatted string with analysis
+
+    Yields:
+        Markdown fragments in document order
     """
     # Organize by table
     organized = organize_db_structure_by_table(db_structure)
-    
-    # Start building the response
-    response = "# MySQL Database Structure Analysis\n\n"
+
+    yield "# MySQL Database Structure Analysis\n\n"
     
     # Database overview
-    response += "## Database Overview\n\n"
-    response += f"- **Total Tables**: {len(organized)}\n"
+    yield "## Database Overview\n\n"
+    yield f"- **Total Tables**: {len(organized)}\n"
     
     # Count total indexes
     total_indexes = sum(len(table_data["indexes"]) for table_data in organized.values())
-    response += f"- **Total Indexes**: {total_indexes}\n"
+    yield f"- **Total Indexes**: {total_indexes}\n"
     
     # Count total foreign keys
     total_fks = sum(len(table_data["foreign_keys"]) for table_data in organized.values())
-    response += f"- **Total Foreign Keys**: {total_fks}\n\n"
+    yield f"- **Total Foreign Keys**: {total_fks}\n\n"
     
     # Storage engines used
     engines = {}
@@ -198,13 +286,13 @@ def analyze_database_structure_for_response(db_structure: Dict[str, Any]) -> str
             engines[engine] = 0
         engines[engine] += 1
     
-    response += "### Storage Engines\n\n"
+    yield "### Storage Engines\n\n"
     for engine, count in engines.items():
-        response += f"- **{engine}**: {count} tables\n"
-    response += "\n"
+        yield f"- **{engine}**: {count} tables\n"
+    yield "\n"
     
     # Table details
-    response += "## Table Details\n\n"
+    yield "## Table Details\n\n"
     
     for table_name, table_data in organized.items():
         info = table_data["info"]
@@ -213,113 +301,124 @@ def analyze_database_structure_for_response(db_structure: Dict[str, Any]) -> str
         foreign_keys = table_data["foreign_keys"]
         stats = table_data.get("stats", {})
         
-        response += f"### {table_name}\n\n"
+        yield f"### {table_name}\n\n"
         
         # Table info
-        response += "#### General Information\n\n"
-        response += f"- **Engine**: {info['engine']}\n"
-        response += f"- **Rows (approx)**: {info['table_rows'] or 'Unknown'}\n"
-        response += f"- **Data Size**: {format_bytes(info['data_length'])}\n"
-        response += f"- **Index Size**: {format_bytes(info['index_length'])}\n"
+        yield "#### General Information\n\n"
+        yield f"- **Engine**: {info['engine']}\n"
+        yield f"- **Rows (approx)**: {info['table_rows'] or 'Unknown'}\n"
+        yield f"- **Data Size**: {format_bytes(info['data_length'])}\n"
+        yield f"- **Index Size**: {format_bytes(info['index_length'])}\n"
         
         if stats:
             if stats.get("Create_time"):
-                response += f"- **Created**: {stats['Create_time']}\n"
+                yield f"- **Created**: {stats['Create_time']}\n"
             if stats.get("Update_time"):
-                response += f"- **Last Updated**: {stats['Update_time']}\n"
+                yield f"- **Last Updated**: {stats['Update_time']}\n"
             if stats.get("Auto_increment"):
-                response += f"- **Auto Increment**: {stats['Auto_increment']}\n"
+                yield f"- **Auto Increment**: {stats['Auto_increment']}\n"
         
         # Columns
-        response += "\n#### Columns\n\n"
-        response += "| Column | Type | Nullable | Key | Default | Extra |\n"
-        response += "| ------ | ---- | -------- | --- | ------- | ----- |\n"
+        yield "\n#### Columns\n\n"
+        yield "| Column | Type | Nullable | Key | Default | Extra |\n"
+        yield "| ------ | ---- | -------- | --- | ------- | ----- |\n"
         
         for column in columns:
-            nullable = "YES" if column["is_nullable"] == "YES" else "NO"
-            key = column["column_key"] or ""
-            default = column["column_default"] or ""
-            extra = column["extra"] or ""
-            
-            response += f"| {column['column_name']} | {column['column_type']} | {nullable} | {key} | {default} | {extra} |\n"
+            name, col_type, nullable, key, default, extra = _GET_COLUMN_ROW(column)
+            nullable = "YES" if nullable == "YES" else "NO"
+            yield f"| {name} | {col_type} | {nullable} | {key or ''} | {default or ''} | {extra or ''} |\n"
         
         # Indexes
         if indexes:
-            response += "\n#### Indexes\n\n"
-            response += "| Name | Columns | Type | Unique |\n"
-            response += "| ---- | ------- | ---- | ------ |\n"
+            yield "\n#### Indexes\n\n"
+            yield "| Name | Columns | Type | Unique |\n"
+            yield "| ---- | ------- | ---- | ------ |\n"
             
             for index in indexes:
-                unique = "No" if index["non_unique"] == 1 else "Yes"
-                response += f"| {index['index_name']} | {index['columns']} | {index['index_type']} | {unique} |\n"
+                name, columns_list, idx_type, non_unique = _GET_INDEX_ROW(index)
+                unique = "No" if non_unique == 1 else "Yes"
+                yield f"| {name} | {columns_list} | {idx_type} | {unique} |\n"
         
         # Foreign Keys
         if foreign_keys:
-            response += "\n#### Foreign Keys\n\n"
-            response += "| Column | References | On Update | On Delete |\n"
-            response += "| ------ | ---------- | --------- | --------- |\n"
+            yield "\n#### Foreign Keys\n\n"
+            yield "| Column | References | On Update | On Delete |\n"
+            yield "| ------ | ---------- | --------- | --------- |\n"
             
             for fk in foreign_keys:
                 ref = f"{fk['referenced_table_name']}({fk['referenced_column_name']})"
-                response += f"| {fk['column_name']} | {ref} | {fk['update_rule']} | {fk['delete_rule']} |\n"
+                yield f"| {fk['column_name']} | {ref} | {fk['update_rule']} | {fk['delete_rule']} |\n"
         
-        response += "\n"
+        yield "\n"
     
     # Add optimization recommendations
-    response += "## Optimization Recommendations\n\n"
-    
-    # Analyze tables without primary keys
-    tables_without_pk = []
-    for table_name, table_data in organized.items():
-        has_pk = any(column["column_key"] == "PRI" for column in table_data["columns"])
-        if not has_pk:
-            tables_without_pk.append(table_name)
-    
+    yield "## Optimization Recommendations\n\n"
+    
+    # Analyze tables without primary keys. The findings are computed
+    # server-side by get_database_structure; fall back to scanning the
+    # organized dict when given a structure dict without them
+    if "tables_without_pk" in db_structure:
+        tables_without_pk = [row["table_name"] for row in db_structure["tables_without_pk"]]
+    else:
+        tables_without_pk = []
+        for table_name, table_data in organized.items():
+            has_pk = any(column["column_key"] == "PRI" for column in table_data["columns"])
+            if not has_pk:
+                tables_without_pk.append(table_name)
+
+
     if tables_without_pk:
-        response += "### Tables Without Primary Keys\n\n"
-        response += "The following tables do not have primary keys, which can cause performance issues:\n\n"
+        yield "### Tables Without Primary Keys\n\n"
+        yield "The following tables do not have primary keys, which can cause performance issues:\n\n"
         for table in tables_without_pk:
-            response += f"- `{table}`\n"
-        response += "\nConsider adding primary keys to these tables.\n\n"
+            yield f"- `{table}`\n"
+        yield "\nConsider adding primary keys to these tables.\n\n"
     
     # Analyze potential index issues
-    tables_with_many_indexes = []
-    for table_name, table_data in organized.items():
-        if len(table_data["indexes"]) > 5:
-            tables_with_many_indexes.append((table_name, len(table_data["indexes"])))
-    
+    if "tables_with_many_indexes" in db_structure:
+        tables_with_many_indexes = [(row["table_name"], row["index_count"])
+                                    for row in db_structure["tables_with_many_indexes"]]
+    else:
+        tables_with_many_indexes = []
+        for table_name, table_data in organized.items():
+            if len(table_data["indexes"]) > 5:
+                tables_with_many_indexes.append((table_name, len(table_data["indexes"])))
+
+
     if tables_with_many_indexes:
-        response += "### Tables With Many Indexes\n\n"
-        response += "The following tables have a high number of indexes, which might impact INSERT/UPDATE performance:\n\n"
+        yield "### Tables With Many Indexes\n\n"
+        yield "The following tables have a high number of indexes, which might impact INSERT/UPDATE performance:\n\n"
         for table, count in tables_with_many_indexes:
-            response += f"- `{table}`: {count} indexes\n"
-        response += "\nConsider reviewing these indexes to ensure they are all necessary.\n\n"
+            yield f"- `{table}`: {count} indexes\n"
+        yield "\nConsider reviewing these indexes to ensure they are all necessary.\n\n"
     
     # Analyze large tables
-    large_tables = []
-    for table_name, table_data in organized.items():
-        data_size = table_data["info"]["data_length"] or 0
-        if data_size > 100 * 1024 * 1024:  # 100 MB
-            large_tables.append((table_name, data_size))
-    
+    if "large_tables" in db_structure:
+        large_tables = [(row["table_name"], row["data_length"])
+                        for row in db_structure["large_tables"]]
+    else:
+        large_tables = []
+        for table_name, table_data in organized.items():
+            data_size = table_data["info"]["data_length"] or 0
+            if data_size > 100 * 1024 * 1024:  # 100 MB
+                large_tables.append((table_name, data_size))
+
+
     if large_tables:
-        response += "### Large Tables\n\n"
-        response += "The following tables are large and may benefit from partitioning or archiving strategies:\n\n"
+        yield "### Large Tables\n\n"
+        yield "The following tables are large and may benefit from partitioning or archiving strategies:\n\n"
         for table, size in large_tables:
-            response += f"- `{table}`: {format_bytes(size)}\n"
-        response += "\n"
-    
-    return response
+            yield f"- `{table}`: {format_bytes(size)}\n"
+        yield "\n"
 
-def format_bytes(bytes_value):
-    """Format bytes to human-readable format"""
-    if bytes_value is None:
-        return "Unknown"
-    
-    bytes_value = float(bytes_value)
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if bytes_value < 1024:
-            return f"{bytes_value:.2f} {unit}"
-        bytes_value /= 1024
-    
-    return f"{bytes_value:.2f} PB"
\ No newline at end of file
+def analyze_database_structure_for_response(db_structure: Dict[str, Any]) -> str:
+    """
+    Analyze database structure and format as a response
+
+    Args:
+        db_structure: Database structure from get_database_structure
+
+    Returns:
+        Formatted string with analysis
+    """
+    return "".join(iter_structure_lines(db_structure))
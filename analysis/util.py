@@ -0,0 +1,19 @@
+"""
+Shared helpers for the analysis modules
+"""
+
+_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+def format_bytes(bytes_value):
+    """Format bytes to human-readable format"""
+    if bytes_value is None:
+        return "Unknown"
+
+    bytes_value = int(bytes_value)
+    if bytes_value <= 0:
+        return f"{bytes_value:.2f} B"
+
+    # Each unit step is 10 bits, so the unit index falls straight out of the
+    # magnitude without a divide loop
+    i = min((bytes_value.bit_length() - 1) // 10, len(_UNITS) - 1)
+    return f"{bytes_value / (1 << (10 * i)):.2f} {_UNITS[i]}"
@@ -1,9 +1,250 @@
+import asyncio
 import json
+import logging
+import os
+import re
+import threading
+import time
 import mysql.connector
-import boto3
+from mysql.connector import pooling
+from mysql.connector.constants import ClientFlag
 import base64
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 
+logger = logging.getLogger("mysql-analyzer")
+
+# Shared connection pools keyed by user and endpoint, created lazily on first
+# connect.
+# Pool size is tunable via MYSQL_POOL_SIZE; pooling amortizes the
+# TCP+TLS+auth handshake across tool calls instead of paying it per call
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+_POOL_SIZE = int(os.environ.get("MYSQL_POOL_SIZE", "25"))
+
+# Prefer the driver's C extension: the pure-Python protocol parser is several
+# times slower on result-set-heavy queries (buffer pool content, slow-query
+# digests). Detect it once at import so connect() never trips over a wheel
+# built without the extension
+try:
+    import _mysql_connector  # noqa: F401
+    _USE_PURE = False
+except ImportError:
+    logger.warning("mysql-connector C extension not available; falling back to pure-Python protocol")
+    _USE_PURE = True
+
+def pool_stats() -> Dict[str, int]:
+    """Return {endpoint: pool_size} for the active connection pools"""
+    with _POOLS_LOCK:
+        return {key: pool.pool_size for key, pool in _POOLS.items()}
+
+def close_pools():
+    """Close every pooled connection; called once at process shutdown"""
+    with _POOLS_LOCK:
+        for key, pool in _POOLS.items():
+            try:
+                pool._remove_connections()
+            except Exception as e:
+                logger.error(f"Error closing connection pool {key}: {str(e)}")
+        _POOLS.clear()
+
+# Secrets Manager clients keyed by region and parsed secrets keyed by
+# (region, secret name) with a TTL, so repeated connects skip the AWS
+# round-trip. Both are shared across connector instances and guarded by
+# a lock since tool calls run concurrently
+_SM_CLIENTS = {}
+_SECRET_CACHE = {}
+_SECRETS_LOCK = threading.Lock()
+_SECRET_TTL = float(os.environ.get("SECRET_TTL_SECONDS", "600"))
+
+def _get_secret(secret_name, region_name):
+    """Fetch and parse a Secrets Manager secret, with client and value caching"""
+    cache_key = (region_name, secret_name)
+    now = time.monotonic()
+
+    with _SECRETS_LOCK:
+        cached = _SECRET_CACHE.get(cache_key)
+        if cached and cached[0] > now:
+            return cached[1]
+        client = _SM_CLIENTS.get(region_name)
+        if client is None:
+            # Deferred import: boto3 costs hundreds of ms to load and is only
+            # needed when credentials come from Secrets Manager
+            import boto3
+            client = boto3.client('secretsmanager', region_name=region_name)
+            _SM_CLIENTS[region_name] = client
+
+    response = client.get_secret_value(SecretId=secret_name)
+    secret_value = response.get('SecretString') or base64.b64decode(response['SecretBinary'])
+    secret = json.loads(secret_value)
+
+    with _SECRETS_LOCK:
+        _SECRET_CACHE[cache_key] = (now + _SECRET_TTL, secret)
+    return secret
+
+def _invalidate_secret(secret_name, region_name):
+    """Drop a cached secret so the next fetch goes back to Secrets Manager
+
+    Called when a connection attempt fails: after a credential rotation the
+    cached value can outlive its validity, and evicting it lets the retry
+    pick up the new credentials instead of failing for the rest of the TTL.
+    """
+    with _SECRETS_LOCK:
+        _SECRET_CACHE.pop((region_name, secret_name), None)
+
+# Short-lived result cache for idempotent read-only queries, keyed by
+# (cache_scope, query, params). Ordered by recency so eviction drops the
+# least-recently-used entry; shared across connectors and lock-guarded
+# since tool calls run concurrently
+_QUERY_CACHE = OrderedDict()
+_QUERY_CACHE_LOCK = threading.Lock()
+_QUERY_CACHE_MAXSIZE = 512
+
+# Cap on rows execute_query materializes in memory; callers that really
+# need unbounded results should use stream_query instead
+_MAX_ROWS = int(os.environ.get("MYSQL_MAX_ROWS", "10000"))
+
+# Per-connection prepared-statement cursors kept at most this many; more than
+# the distinct statements in db/queries.py, so steady state never evicts
+_PREPARED_CACHE_MAXSIZE = 64
+
+# Server variables snapshotted once per physical connection at connect()
+# time. They are static for the life of a connection, so tools read them
+# from connector.server_config instead of issuing SHOW VARIABLES probes
+_SERVER_CONFIG_VARS = (
+    'slow_query_log',
+    'performance_schema',
+    'innodb_page_size',
+    'innodb_buffer_pool_size',
+    'version',
+)
+
+# Statement keywords rejected in read-only mode. The check pulls the first
+# word off the statement and probes this set, which is O(1) however many
+# keywords are listed — cheaper than a regex alternation or an automaton at
+# this size, and unaffected if the set grows
+_DANGEROUS_OPS = frozenset((
+    'insert', 'update', 'delete', 'drop', 'alter', 'create', 'truncate',
+    'grant', 'revoke', 'reset', 'load', 'optimize', 'repair', 'flush'
+))
+
+# All complexity features in one alternation so the analyzer makes a single
+# pass over the query instead of a dozen substring scans
+_COMPLEXITY_RE = re.compile(
+    r"(?P<join>\b(?:inner\s+|left\s+(?:outer\s+)?|right\s+(?:outer\s+)?|full\s+)?join\b)"
+    r"|(?P<subquery>\(\s*select\b)"
+    r"|(?P<agg>\b(?:count|sum|avg|max|min)\s*\()"
+    r"|(?P<force>\bforce\s+index\b)"
+    r"|(?P<where>\bwhere\b)"
+    r"|(?P<order>\border\s+by\b)"
+    r"|(?P<andor>\b(?:and|or)\b)"
+    r"|(?P<comma>,)",
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=1024)
+def _analyze_query_complexity(query):
+    """Single-pass complexity scan; cached since MCP sessions repeat queries
+
+    Warnings are returned as a tuple so the cached value stays immutable.
+    """
+    # Fast path: a short query containing none of the scanned features is
+    # exactly the zero result, so skip the regex pass entirely. casefold once
+    # here instead of lowercasing per feature check
+    if len(query) < 200:
+        ql = query.casefold()
+        if ('join' not in ql and '(' not in ql
+                and 'where' not in ql and 'order' not in ql):
+            return {
+                'complexity_score': 0,
+                'warnings': (),
+                'join_count': 0,
+                'subquery_count': 0,
+                'aggregation_count': 0
+            }
+
+    join_count = 0
+    subquery_count = 0
+    agg_count = 0
+    force_index = False
+    and_or_count = 0
+    comma_count = 0
+    where_pos = -1
+    order_by_pos = -1
+
+    for match in _COMPLEXITY_RE.finditer(query):
+        kind = match.lastgroup
+        if kind == 'join':
+            # Each join is counted once; the old per-variant substring checks
+            # counted e.g. 'inner join' twice ('join' matched it too)
+            join_count += 1
+        elif kind == 'subquery':
+            subquery_count += 1
+        elif kind == 'agg':
+            agg_count += 1
+        elif kind == 'force':
+            force_index = True
+        elif kind == 'where':
+            if where_pos < 0:
+                where_pos = match.start()
+        elif kind == 'order':
+            if order_by_pos < 0:
+                order_by_pos = match.start()
+        elif kind == 'andor':
+            # Only conditions inside the WHERE clause count
+            if where_pos >= 0 and match.start() > where_pos:
+                and_or_count += 1
+        elif kind == 'comma':
+            # Only columns after ORDER BY count
+            if order_by_pos >= 0 and match.start() > order_by_pos:
+                comma_count += 1
+
+    complexity_score = join_count * 2 + subquery_count * 3 + agg_count
+    warnings = []
+
+    if join_count > 3:
+        warnings.append(f"Query contains {join_count} joins - consider simplifying")
+    if subquery_count > 2:
+        warnings.append(f"Query contains {subquery_count} subqueries - consider restructuring")
+    if force_index:
+        complexity_score += 2
+        warnings.append("Query uses FORCE INDEX - consider if this is necessary")
+    if where_pos >= 0:
+        complexity_score += and_or_count
+        if and_or_count > 5:
+            warnings.append(f"Complex WHERE clause with {and_or_count} conditions")
+    if order_by_pos >= 0:
+        complexity_score += comma_count
+        if comma_count > 2:
+            warnings.append(f"ORDER BY with {comma_count + 1} columns may impact performance")
+
+    return {
+        'complexity_score': complexity_score,
+        'warnings': tuple(warnings),
+        'join_count': join_count,
+        'subquery_count': subquery_count,
+        'aggregation_count': agg_count
+        }
+
+def analyze_query_complexity(query):
+    """
+    Analyze query complexity and potential resource impact
+
+    Module-level so callers without a connector can use it; the scan itself
+    is memoized in _analyze_query_complexity and this wrapper only converts
+    the frozen cached value into the mutable dict callers expect.
+
+    Args:
+        query (str): SQL query to analyze
+
+    Returns:
+        dict: Complexity metrics
+    """
+    result = dict(_analyze_query_complexity(query))
+    result['warnings'] = list(result['warnings'])
+    return result
+
 class MySQLConnector:
     def __init__(self, secret_name=None, region_name=None, host=None, port=None, 
                  database=None, user=None, password=None):
@@ -16,170 +257,348 @@ class MySQLConnector:
         self.password = password
         self.conn = None
         self.read_only = True  # Default to read-only mode
+        self.server_config = {}  # _SERVER_CONFIG_VARS snapshot, filled on connect
+        self._prepared_cursors = OrderedDict()  # query text -> prepared cursor
         
     def connect(self):
         """Connect to MySQL database using either AWS Secrets or direct credentials"""
         try:
             if self.secret_name and self.region_name:
-                # Get credentials from AWS Secrets Manager
-                session = boto3.session.Session()
-                client = session.client(
-                    service_name='secretsmanager',
-                    region_name=self.region_name
-                )
-                
-                get_secret_value_response = client.get_secret_value(
-                    SecretId=self.secret_name
-                )
-                
-                if 'SecretString' in get_secret_value_response:
-                    secret = json.loads(get_secret_value_response['SecretString'])
-                    self.host = secret.get('host')
-                    self.port = secret.get('port', 3306)
-                    self.database = secret.get('dbname')
-                    self.user = secret.get('username')
-                    self.password = secret.get('password')
-                else:
-                    decoded_binary_secret = base64.b64decode(get_secret_value_response['SecretBinary'])
-                    secret = json.loads(decoded_binary_secret)
-                    self.host = secret.get('host')
-                    self.port = secret.get('port', 3306)
-                    self.database = secret.get('dbname')
-                    self.user = secret.get('username')
-                    self.password = secret.get('password')
+                # Get credentials from AWS Secrets Manager (cached)
+                secret = _get_secret(self.secret_name, self.region_name)
+                self.host = secret.get('host')
+                self.port = secret.get('port', 3306)
+                self.database = secret.get('dbname')
+                self.user = secret.get('username')
+                self.password = secret.get('password')
             elif not all([self.host, self.database, self.user, self.password]):
                 # If direct credentials are not provided and no secret name, we can't connect
-                print("Error: Either AWS Secrets Manager details or direct database credentials must be provided")
+                logger.error("Either AWS Secrets Manager details or direct database credentials must be provided")
                 return False
             
-            # Connect to the database
-            self.conn = mysql.connector.connect(
-                host=self.host,
-                port=self.port or 3306,
-                database=self.database,
-                user=self.user,
-                password=self.password
-            )
-            
-            # Set session to read-only mode for safety
+            # Check a connection out of the shared pool for this user and
+            # endpoint, creating the pool on first use. The username is part
+            # of the key so two secrets resolving to the same endpoint with
+            # different credentials never share a pool
+            pool_key = f"{self.user}@{self.host}:{self.port or 3306}/{self.database}"
+            with _POOLS_LOCK:
+                pool = _POOLS.get(pool_key)
+                if pool is None:
+                    pool = pooling.MySQLConnectionPool(
+                        pool_name=f"mysql_analyzer_{len(_POOLS)}",
+                        pool_size=_POOL_SIZE,
+                        pool_reset_session=False,
+                        host=self.host,
+                        port=self.port or 3306,
+                        database=self.database,
+                        user=self.user,
+                        password=self.password,
+                        client_flags=[ClientFlag.MULTI_STATEMENTS],
+                        use_pure=_USE_PURE
+                    )
+                    _POOLS[pool_key] = pool
+            self.conn = pool.get_connection()
+
+            # Set session to read-only mode for safety. The flag lives on the
+            # underlying connection (not the per-checkout pool wrapper), and
+            # pool_reset_session=False keeps the session settings across
+            # checkins, so each pooled connection pays this only once
+            inner = getattr(self.conn, "_cnx", self.conn)
             if self.read_only:
+                if not getattr(inner, "_read_only_applied", False):
+                    with self.conn.cursor() as cursor:
+                        # transaction_read_only is the system-variable spelling
+                        # of SET SESSION TRANSACTION READ ONLY, so both settings
+                        # ride one SET statement and one round trip
+                        cursor.execute(
+                            "SET SESSION transaction_read_only = ON, "
+                            "SESSION max_execution_time = 30000"  # 30-second timeout
+                        )
+                    inner._read_only_applied = True
+
+            # Snapshot static server variables once per physical connection;
+            # warm checkouts reuse the dict cached on the connection and pay
+            # no round trip
+            config = getattr(inner, "_server_config", None)
+            if config is None:
+                placeholders = ', '.join(['%s'] * len(_SERVER_CONFIG_VARS))
                 with self.conn.cursor() as cursor:
-                    cursor.execute("SET SESSION TRANSACTION READ ONLY")
-                    cursor.execute("SET SESSION MAX_EXECUTION_TIME=30000")  # 30-second timeout
-            
-            print(f"Connected to MySQL database: {self.database} at {self.host}")
+                    cursor.execute(
+                        f"SHOW VARIABLES WHERE Variable_name IN ({placeholders})",
+                        _SERVER_CONFIG_VARS
+                    )
+                    config = {name: value for name, value in cursor.fetchall()}
+                inner._server_config = config
+            self.server_config = config
+
+            logger.info(f"Connected to MySQL database: {self.database} at {self.host}")
             return True
         except Exception as e:
-            print(f"Error connecting to database: {str(e)}")
+            logger.error(f"Error connecting to database: {str(e)}")
+            if self.secret_name and self.region_name:
+                # The failure may be stale rotated credentials; make the next
+                # attempt refetch instead of replaying the cached secret
+                _invalidate_secret(self.secret_name, self.region_name)
             return False
     
+    @property
+    def cache_scope(self):
+        """Hashable key identifying this server and schema for shared caches
+
+        Carries the endpoint, not just the database name, so two servers
+        that happen to share a schema name never serve each other's cached
+        rows. Only meaningful after connect(), which is when the caches are
+        consulted.
+        """
+        return (self.host, self.port or 3306, self.database)
+
+    async def aconnect(self):
+        """Async variant of connect
+
+        connect() can block on a Secrets Manager HTTP call and the MySQL
+        handshake; running it in a worker thread keeps those stalls off the
+        event loop when called from async tool handlers.
+        """
+        return await asyncio.to_thread(self.connect)
+
     def disconnect(self):
         """Close the database connection"""
         if self.conn:
             try:
-                self.conn.close()
+                for cursor in self._prepared_cursors.values():
+                    cursor.close()
+                self._prepared_cursors.clear()
+                self.conn.close()  # Returns the connection to its pool
                 self.conn = None
-                print("Database connection closed")
+                logger.info("Database connection returned to pool")
             except Exception as e:
-                print(f"Error closing database connection: {str(e)}")
+                logger.error(f"Error closing database connection: {str(e)}")
     
-    def execute_query(self, query, params=None):
-        """Execute a query and return results as a list of dictionaries"""
+    def _blocked_write(self, query):
+        """Return True (and log) if query is a write blocked by read-only mode"""
+        if not self.read_only:
+            return False
+        # First keyword of the statement: the slice bounds the work for long
+        # texts and the alpha run stops at whitespace or punctuation, so
+        # e.g. 'insert(' is still caught
+        head = query.lstrip()[:16].lower()
+        i = 0
+        while i < len(head) and head[i].isalpha():
+            i += 1
+        if head[:i] in _DANGEROUS_OPS:
+            logger.warning(f"Write operation '{head[:i]}' attempted in read-only mode")
+            return True
+        return False
+
+    def execute_query(self, query, params=None, dict_rows=True):
+        """Execute a query and return results as a list of dictionaries
+
+        Pass dict_rows=False to get the driver's raw tuples instead; for
+        large result sets consumed positionally that skips building one
+        dict per row.
+        """
         if not self.conn:
-            print("No database connection. Call connect() first.")
+            logger.error("No database connection. Call connect() first.")
             return []
-        
+
         try:
-            with self.conn.cursor(dictionary=True) as cursor:
+            # Unbuffered so rows stream from the server as we fetch instead of
+            # the driver materializing the whole set up front
+            with self.conn.cursor(buffered=False) as cursor:
                 # For safety, check if this is a potentially dangerous operation
-                if self.read_only:
-                    query_lower = query.lower().strip()
-                    dangerous_operations = [
-                        'insert', 'update', 'delete', 'drop', 'alter', 'create', 'truncate', 
-                        'grant', 'revoke', 'reset', 'load', 'optimize', 'repair', 'flush'
-                    ]
-                    
-                    # Check if query starts with any dangerous operation
-                    for op in dangerous_operations:
-                        if query_lower.startswith(op):
-                            print(f"Error: Write operation '{op}' attempted in read-only mode")
-                            return []
-                
+                if self._blocked_write(query):
+                    return []
+
                 cursor.execute(query, params or ())
-                
-                # For SELECT queries, return results
+
+                # For SELECT queries, return results up to the row cap
                 if cursor.description:
-                    results = cursor.fetchall()
-                    return list(results)  # Convert to list for consistency
-                
+                    if dict_rows:
+                        # Hoist the column names once and build the row dicts
+                        # with a C-level zip; cheaper than the driver's
+                        # dictionary cursor, which re-derives the keys per row
+                        cols = [d[0] for d in cursor.description]
+                        results = [dict(zip(cols, row)) for row in cursor.fetchmany(_MAX_ROWS)]
+                    else:
+                        results = cursor.fetchmany(_MAX_ROWS)
+                    # Drain anything past the cap so the connection is left
+                    # clean, without holding the extra rows in memory
+                    dropped = sum(1 for _ in cursor)
+                    if dropped:
+                        logger.warning(f"Query result truncated to {_MAX_ROWS} rows "
+                              f"({dropped} dropped); use stream_query for the full set")
+                    return results
+
                 # For non-SELECT queries, commit and return empty list
                 self.conn.commit()
                 return []
         except Exception as e:
             self.conn.rollback()
-            print(f"Error executing query: {str(e)}")
+            logger.error(f"Error executing query: {str(e)}")
+            return []
+
+    def execute_cached_query(self, query, params=None, ttl=30):
+        """Execute a query, serving repeats from a short-lived shared cache
+
+        Only for idempotent read-only queries (catalog lookups, status
+        snapshots) where a result up to ttl seconds old is acceptable; a
+        cache hit skips the server round-trip entirely.
+
+        Args:
+            query (str): SQL query to execute
+            params (tuple, optional): Parameters for the query
+            ttl (int): Seconds a cached result stays valid
+
+        Returns:
+            list: Query results as a list of dictionaries
+        """
+        key = (self.cache_scope, query, tuple(params) if params else None)
+        now = time.monotonic()
+
+        with _QUERY_CACHE_LOCK:
+            hit = _QUERY_CACHE.get(key)
+            if hit is not None and hit[0] > now:
+                _QUERY_CACHE.move_to_end(key)
+                return hit[1]
+
+        result = self.execute_query(query, params)
+
+        with _QUERY_CACHE_LOCK:
+            _QUERY_CACHE[key] = (now + ttl, result)
+            _QUERY_CACHE.move_to_end(key)
+            while len(_QUERY_CACHE) > _QUERY_CACHE_MAXSIZE:
+                _QUERY_CACHE.popitem(last=False)
+
+        return result
+
+    async def aexecute_query(self, query, params=None, dict_rows=True):
+        """Async variant of execute_query
+
+        Runs the blocking driver call in a worker thread so the MCP event
+        loop keeps serving other requests while the query is in flight.
+        """
+        return await asyncio.to_thread(self.execute_query, query, params, dict_rows)
+
+    def execute_prepared(self, query, params=None):
+        """Execute a parameterized query through a cached server-side prepared statement
+
+        The prepared cursor is memoized by query text, so repeated calls with
+        the same SQL shape skip the server-side parse/plan step.
+
+        Args:
+            query: SQL text with %s placeholders
+            params: Parameter tuple for the placeholders
+
+        Returns:
+            List of result rows as dictionaries
+        """
+        if not self.conn:
+            logger.error("No database connection. Call connect() first.")
+            return []
+
+        try:
+            cursor = self._prepared_cursors.get(query)
+            if cursor is None:
+                # Bound the cache: deallocate the oldest statement first so a
+                # long session with many distinct queries cannot pile up
+                # server-side prepared statements
+                while len(self._prepared_cursors) >= _PREPARED_CACHE_MAXSIZE:
+                    _, oldest = self._prepared_cursors.popitem(last=False)
+                    oldest.close()
+                cursor = self.conn.cursor(prepared=True)
+                self._prepared_cursors[query] = cursor
+
+            cursor.execute(query, params or ())
+
+            if cursor.description:
+                # Prepared cursors return plain tuples; build dicts to match
+                # the execute_query result shape
+                columns = [desc[0] for desc in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return []
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error executing prepared query: {str(e)}")
+            return []
+
+    def stream_query(self, query, params=None):
+        """Iterate over query results lazily using an unbuffered cursor
+
+        Rows are fetched from the server as they are consumed rather than
+        materialized up front, so peak memory stays flat however large the
+        result set is.
+
+        Args:
+            query: SQL text, optionally with %s placeholders
+            params: Parameter tuple for the placeholders
+
+        Yields:
+            Result rows as dictionaries
+        """
+        if not self.conn:
+            logger.error("No database connection. Call connect() first.")
+            return
+
+        if self._blocked_write(query):
+            return
+
+        cursor = self.conn.cursor(dictionary=True, buffered=False)
+        try:
+            cursor.execute(query, params or ())
+            for row in cursor:
+                yield row
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+        finally:
+            cursor.close()
+
+    def execute_multi(self, queries, params=None):
+        """Execute several statements in one round-trip and return their result sets
+
+        Args:
+            queries: List of SQL statements to send as one batch
+            params: Optional parameter tuple covering every %s placeholder in
+                the batch, in statement order
+
+        Returns:
+            List of result-set lists, one per statement, in order
+        """
+        if not self.conn:
+            logger.error("No database connection. Call connect() first.")
+            return []
+
+        # Apply the same read-only safety check to every statement in the batch
+        for statement in queries:
+            if self._blocked_write(statement):
+                return []
+
+        try:
+            with self.conn.cursor(dictionary=True) as cursor:
+                result_sets = []
+                # multi=True sends the whole batch in one network write and
+                # yields a cursor per statement as result sets arrive
+                for result in cursor.execute(";\n".join(queries), params, multi=True):
+                    if result.description:
+                        result_sets.append(list(result.fetchall()))
+                    else:
+                        result_sets.append([])
+                return result_sets
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error executing batch: {str(e)}")
             return []
 
     def analyze_query_complexity(self, query):
         """
         Analyze query complexity and potential resource impact
-        
+
+        Thin shim over the module-level analyze_query_complexity, kept for
+        callers that already hold a connector.
+
         Args:
             query (str): SQL query to analyze
-        
+
         Returns:
             dict: Complexity metrics
         """
-        query_lower = query.lower()
-        complexity_score = 0
-        warnings = []
-        
-        # Check for joins
-        join_count = sum(1 for join_type in ['join', 'inner join', 'left join', 'right join', 'full join'] 
-                        if join_type in query_lower)
-        complexity_score += join_count * 2
-        if join_count > 3:
-            warnings.append(f"Query contains {join_count} joins - consider simplifying")
-        
-        # Check for subqueries
-        subquery_count = query_lower.count('(select')
-        complexity_score += subquery_count * 3
-        if subquery_count > 2:
-            warnings.append(f"Query contains {subquery_count} subqueries - consider restructuring")
-        
-        # Check for aggregations
-        agg_functions = ['count(', 'sum(', 'avg(', 'max(', 'min(']
-        agg_count = sum(query_lower.count(func) for func in agg_functions)
-        complexity_score += agg_count
-        
-        # Check for MySQL-specific features
-        if 'force index' in query_lower:
-            complexity_score += 2
-            warnings.append("Query uses FORCE INDEX - consider if this is necessary")
-        
-        # Check for complex WHERE conditions
-        where_pos = query_lower.find('where')
-        if where_pos != -1:
-            where_clause = query_lower[where_pos:]
-            and_count = where_clause.count(' and ')
-            or_count = where_clause.count(' or ')
-            complexity_score += (and_count + or_count)
-            if (and_count + or_count) > 5:
-                warnings.append(f"Complex WHERE clause with {and_count + or_count} conditions")
-        
-        # Check for ORDER BY with multiple columns
-        order_by_pos = query_lower.find('order by')
-        if order_by_pos != -1:
-            order_clause = query_lower[order_by_pos:]
-            comma_count = order_clause.count(',')
-            complexity_score += comma_count
-            if comma_count > 2:
-                warnings.append(f"ORDER BY with {comma_count + 1} columns may impact performance")
-        
-        return {
-            'complexity_score': complexity_score,
-            'warnings': warnings,
-            'join_count': join_count,
-            'subquery_count': subquery_count,
-            'aggregation_count': agg_count
-            }
\ No newline at end of file
+        return analyze_query_complexity(query)
@@ -84,27 +84,32 @@ GET_TABLE_STATUS = """
     SHOW TABLE STATUS
 """
 
-# Table statistics queries
+# Table statistics queries. {placeholders} expands to the %s list for the
+# IN clause, so table names travel as bound parameters rather than being
+# formatted into the SQL text:
+#     placeholders = ', '.join(['%s'] * len(names))
+#     connector.execute_query(GET_TABLE_STATISTICS.format(placeholders=placeholders),
+#                             tuple(names))
 GET_TABLE_STATISTICS = """
-    SELECT 
+    SELECT
         table_name,
         table_rows,
         avg_row_length,
         data_length,
         index_length,
         auto_increment
-    FROM 
+    FROM
         information_schema.tables
-    WHERE 
+    WHERE
         table_schema = DATABASE()
-        AND table_name IN ({table_names})
+        AND table_name IN ({placeholders})
 """
 
 GET_TABLE_STATUS_BY_NAME = """
-    SHOW TABLE STATUS LIKE '{table_name}'
+    SHOW TABLE STATUS LIKE %s
 """
 
-# Index information queries
+# Index information queries; {placeholders} as for GET_TABLE_STATISTICS
 GET_INDEX_INFORMATION = """
     SELECT 
         table_name,
@@ -114,10 +119,10 @@ GET_INDEX_INFORMATION = """
         non_unique
     FROM 
         information_schema.statistics
-    WHERE 
+    WHERE
         table_schema = DATABASE()
-        AND table_name IN ({table_names})
-    GROUP BY 
+        AND table_name IN ({placeholders})
+    GROUP BY
         table_name, index_name, index_type, non_unique
     ORDER BY 
         table_name, index_name
@@ -144,12 +149,13 @@ GET_SLOW_QUERIES = """
         SUM_ROWS_EXAMINED/COUNT_STAR as avg_rows_examined,
         SUM_CREATED_TMP_TABLES as tmp_tables,
         SUM_NO_INDEX_USED as no_index_used
-    FROM 
+    FROM
         performance_schema.events_statements_summary_by_digest
-    WHERE 
-        AVG_TIMER_WAIT/1000000000 >= %s
-    ORDER BY 
-        avg_exec_time_ms DESC
+    WHERE
+        AVG_TIMER_WAIT >= %s * 1000000000
+        AND LAST_SEEN > NOW() - INTERVAL 60 MINUTE
+    ORDER BY
+        AVG_TIMER_WAIT DESC
     LIMIT %s
 """
 
@@ -216,13 +222,29 @@ GET_FRAGMENTED_TABLES = """
         data_length DESC
 """
 
-# MySQL settings
+# MySQL settings. The filtered form binds the LIKE pattern as a parameter
+# (pass e.g. '%innodb%'); performance_schema.global_variables supports
+# WHERE/ORDER BY pushdown, which SHOW VARIABLES does not
 GET_MYSQL_SETTINGS = """
-    SHOW VARIABLES
+    SELECT
+        VARIABLE_NAME AS Variable_name,
+        VARIABLE_VALUE AS Value
+    FROM
+        performance_schema.global_variables
+    ORDER BY
+        VARIABLE_NAME
 """
 
 GET_MYSQL_SETTINGS_FILTERED = """
-    SHOW VARIABLES WHERE Variable_name LIKE '%{pattern}%'
+    SELECT
+        VARIABLE_NAME AS Variable_name,
+        VARIABLE_VALUE AS Value
+    FROM
+        performance_schema.global_variables
+    WHERE
+        VARIABLE_NAME LIKE %s
+    ORDER BY
+        VARIABLE_NAME
 """
 
 # Read-only session settings
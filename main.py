@@ -1,11 +1,15 @@
 import argparse
+import atexit
 import logging
 import os
+import signal
+import sys
 from starlette.responses import Response
 from starlette.requests import Request
 from mcp.server.fastmcp import FastMCP
 
 from config import configure_logging, server_lifespan, session_handler
+from db.connector import close_pools, pool_stats
 from tools.mcp_tools import register_all_tools
 
 # Configure logging
@@ -60,7 +64,11 @@ async def session_status(request):
     
     content = f"Active sessions: {active_sessions}\n"
     content += f"Session IDs: {', '.join(session_ids)}\n"
-    
+
+    # Connection pool stats for debugging
+    for endpoint, size in pool_stats().items():
+        content += f"Connection pool {endpoint}: size {size}\n"
+
     return Response(
         content=content,
         status_code=200,
@@ -99,12 +107,23 @@ if __name__ == "__main__":
     logger.info(f"Session timeout: {args.session_timeout} seconds")
     logger.info(f"Request timeout: {args.request_timeout} seconds")
     
+    # Drain pooled MySQL connections exactly once at process exit; the
+    # session handler's cleanup task is stopped by server_lifespan
+    atexit.register(close_pools)
+
+    def _handle_sigterm(signum, frame):
+        # Exit cleanly so the lifespan shutdown and atexit hooks run; the
+        # process supervisor (systemd/ECS) handles restarting us
+        logger.info("Received SIGTERM, shutting down")
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
     try:
         mcp.run(transport='streamable-http')
     except Exception as e:
+        # Let crashes propagate after logging: an in-process restart would
+        # leak the first instance's pools, sockets and tasks, doubling
+        # resident memory. A supervisor restart starts from a clean slate
         logger.error(f"Server error: {str(e)}")
-        # If the server crashes, try to restart it
-        import time
-        time.sleep(5)  # Wait 5 seconds before restarting
-        logger.info("Attempting to restart server...")
-        mcp.run(transport='streamable-http')
\ No newline at end of file
+        raise
\ No newline at end of file
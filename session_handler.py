@@ -1,17 +1,31 @@
 import asyncio
 import logging
 import time
+from collections import OrderedDict
 from typing import Dict, Any
 from contextlib import asynccontextmanager
 
 logger = logging.getLogger("mysql-analyzer")
 
 class SessionHandler:
+    """Tracks MCP sessions and expires idle ones.
+
+    The per-session lock is for session-local state only (in-session caches,
+    bookkeeping). It must not be held across database calls: tool handlers
+    create their own MySQLConnector per invocation and draw from the shared
+    connection pool, which does its own concurrency control — wrapping DB
+    access in the session lock would just serialize a session's queries for
+    no safety gain.
+    """
     def __init__(self, session_timeout=1800):
-        self.sessions = {}
-        self.session_locks = {}
+        # One ordered dict per session holding its lock and access times.
+        # Access moves the entry to the end, so the dict stays ordered by
+        # last_access and expiry only ever looks at the front
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
         self.session_timeout = session_timeout  # in seconds
         self.cleanup_task = None
+        # Wakes the cleanup task when a session is registered after idle
+        self._wake = asyncio.Event()
     
     async def start(self):
         """Start the session handler and its cleanup task"""
@@ -29,41 +43,65 @@ class SessionHandler:
         logger.info("Session handler stopped")
     
     def get_session_lock(self, session_id: str):
-        """Get or create a lock for the given session"""
-        if session_id not in self.session_locks:
-            self.session_locks[session_id] = asyncio.Lock()
-            self.sessions[session_id] = {
-                "created_at": time.time(),
-                "last_access": time.time()
+        """Get or create a lock for the given session
+
+        The lock guards session-local state only; see the class docstring —
+        database access goes through the pool and needs no session lock.
+        """
+        now = time.time()
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            entry = {
+                "lock": asyncio.Lock(),
+                "created_at": now,
+                "last_access": now
             }
+            self.sessions[session_id] = entry
             logger.info(f"New session registered: {session_id}")
+            self._wake.set()
         else:
-            # Update last access time
-            self.sessions[session_id]["last_access"] = time.time()
-            
-        return self.session_locks[session_id]
-    
+            # Update last access time and keep the dict ordered by it
+            entry["last_access"] = now
+            self.sessions.move_to_end(session_id)
+
+        return entry["lock"]
+
     async def _cleanup_expired_sessions(self):
         """Periodically clean up expired sessions"""
         try:
             while True:
-                await asyncio.sleep(60)  # Check every minute
+                # Sleep only until the oldest session could expire (capped at
+                # 60s); with no sessions at all, wait for the wake event so an
+                # idle server stops waking pointlessly
+                if self.sessions:
+                    oldest = next(iter(self.sessions.values()))
+                    delay = oldest["last_access"] + self.session_timeout - time.time()
+                    delay = min(max(delay, 1.0), 60.0)
+                else:
+                    delay = None
+
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
                 current_time = time.time()
-                expired_sessions = [
-                    sid for sid, session in self.sessions.items()
-                    if current_time - session["last_access"] > self.session_timeout
-                ]
-                
-                for sid in expired_sessions:
-                    if sid in self.sessions:
-                        del self.sessions[sid]
-                    if sid in self.session_locks:
-                        del self.session_locks[sid]
+
+                # The dict is ordered by last_access, so expired sessions sit
+                # at the front; pop until the first live one
+                expired_count = 0
+                while self.sessions:
+                    sid, entry = next(iter(self.sessions.items()))
+                    if current_time - entry["last_access"] <= self.session_timeout:
+                        break
+                    self.sessions.popitem(last=False)
+                    expired_count += 1
                     logger.info(f"Expired session removed: {sid}")
-                
-                if expired_sessions:
-                    logger.info(f"Cleaned up {len(expired_sessions)} expired sessions")
-                
+
+                if expired_count:
+                    logger.info(f"Cleaned up {expired_count} expired sessions")
+
                 # Log active session count
                 logger.info(f"Active sessions: {len(self.sessions)}")
         except asyncio.CancelledError:
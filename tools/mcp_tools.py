@@ -2,23 +2,35 @@
 MCP tool definitions for MySQL Performance Analyzer.
 This file contains all the tool functions that are registered with the MCP server.
 """
+import asyncio
 import json
+import re
 import time
+import traceback
+from collections import defaultdict
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from mcp.server.fastmcp import Context, FastMCP
 
+# orjson parses the large nested EXPLAIN plans several times faster than the
+# stdlib; fall back silently when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from db.connector import MySQLConnector
+from analysis.util import format_bytes
 from analysis.structure import (
     get_database_structure, 
     organize_db_structure_by_table,
     analyze_database_structure_for_response
 )
 from analysis.query import (
-    extract_tables_from_query, 
-    get_table_statistics, 
-    get_schema_information, 
-    get_index_information,
-    format_query_analysis_response
+    extract_tables_from_query,
+    get_table_metadata,
+    format_query_analysis_response,
+    clear_cache
 )
 from analysis.patterns import (
     detect_query_patterns, 
@@ -32,6 +44,218 @@ from analysis.indexes import (
     format_index_recommendations_response
 )
 
+# First keyword of a statement, skipping any leading /* ... */ comments so
+# hinted queries do not classify as type "/*"; matching this instead of
+# upper().split() touches a handful of bytes rather than the whole
+# (possibly multi-KB) digest
+_QUERY_HEAD_RE = re.compile(
+    r"\s*(?:/\*.*?\*/\s*)*"
+    r"(INSERT\s+IGNORE|SELECT|INSERT|UPDATE|DELETE|REPLACE|CREATE|ALTER|DROP"
+    r"|[A-Za-z]+)",
+    re.IGNORECASE | re.DOTALL
+)
+
+@lru_cache(maxsize=1024)
+def _query_head(prefix: str) -> str:
+    """Statement category from a prefix, uppercased, or 'OTHER'
+
+    One anchored scan distinguishes the multi-word INSERT IGNORE form and
+    the common DML/DDL keywords; anything else falls through to its first
+    keyword. Callers pass only the first 64 characters so the cache key
+    (and the regex scan on a miss) never covers a full digest.
+    """
+    m = _QUERY_HEAD_RE.match(prefix)
+    if not m:
+        return 'OTHER'
+    return ' '.join(m.group(1).upper().split())
+
+# Variable names whose numeric values read better annotated as bytes; one
+# compiled scan per row instead of lowercasing the name and probing four
+# substrings through a Python generator
+_SIZE_SETTING_RE = re.compile(r'size|buffer|cache|length', re.IGNORECASE)
+
+# Trailing top-level LIMIT clause; execute_read_only_query only wraps a
+# SELECT with its own row cap when the caller has not already set one
+_TRAILING_LIMIT_RE = re.compile(r"\blimit\s+\d+\s*(?:,\s*\d+)?\s*;?\s*$", re.IGNORECASE)
+
+# Line comment on the final line of a statement. Wrapping such a query in a
+# derived table would let the comment swallow the closing paren, so the
+# LIMIT pushdown is skipped and the Python-side slice caps the rows instead
+_TRAILING_LINE_COMMENT_RE = re.compile(r"(?:--|#)[^\n]*$")
+
+# EXPLAIN plans for an unchanged query go stale no faster than table
+# statistics do, so repeat analyses of the same query within this window
+# skip the EXPLAIN round trip
+_EXPLAIN_TTL = 60
+
+# Per-row report template for get_slow_queries, hoisted so the format spec
+# is parsed once instead of per row
+_SLOW_QUERY_ROW_TMPL = """### Query {i}
+- **Average Execution Time**: {avg_exec_time_ms:.2f}ms
+- **Total Execution Time**: {total_time_ms:.2f}ms
+- **Calls**: {calls}
+- **Average Rows Returned**: {avg_rows}
+- **Average Rows Examined**: {avg_rows_examined}
+- **Max Execution Time**: {max_time_ms:.2f}ms
+- **Min Execution Time**: {min_time_ms:.2f}ms
+- **Temporary Tables Created**: {tmp_tables}
+- **No Index Used Count**: {no_index_used}
+- **SQL**: ```sql
+{query}
+```
+
+#### Complexity Analysis
+- **Complexity Score**: {complexity_score}
+- **Join Count**: {join_count}
+- **Subquery Count**: {subquery_count}
+- **Aggregation Count**: {aggregation_count}
+"""
+
+# Complexity section of the rewrite report; hoisted like the slow-query row
+# template so the format string is parsed at import, not per call
+_COMPLEXITY_TMPL = """### Query Complexity Analysis
+- **Complexity Score**: {complexity_score}
+- **Join Count**: {join_count}
+- **Subquery Count**: {subquery_count}
+- **Aggregation Count**: {aggregation_count}
+"""
+
+# Recommendation blocks for analyze_innodb_buffer_pool and
+# analyze_table_fragmentation; the static prose is built once at import and
+# only the numbers interpolate per call
+_BP_RESIZE_TMPL = """### Buffer Pool Size
+
+{reason}
+
+```sql
+SET GLOBAL innodb_buffer_pool_size = {new_size};
+```
+
+For permanent changes, update your my.cnf file:
+
+```
+innodb_buffer_pool_size = {new_size_h}
+```
+
+"""
+
+_BP_HIT_RATIO_TMPL = """### Hit Ratio
+
+The buffer pool hit ratio is {hit_ratio:.2f}%, which is below the recommended 95%. This indicates that MySQL is reading from disk more often than optimal.
+
+Consider:
+1. Increasing the buffer pool size if memory is available
+2. Optimizing queries to reduce the working set size
+3. Adding appropriate indexes to reduce full table scans
+
+"""
+
+_FRAG_TABLE_TMPL = """### {name}
+
+- **Fragmentation**: {fragmentation:.2f}%
+- **Size**: {size_h}
+- **Recommendation**: Run OPTIMIZE TABLE to defragment and reclaim space
+
+```sql
+OPTIMIZE TABLE {name};
+```
+
+Note: OPTIMIZE TABLE locks the table during operation. Consider running during off-peak hours.
+
+"""
+
+_FRAG_GENERAL_RECS = """## General Recommendations
+
+1. **Regular Maintenance**: Schedule regular OPTIMIZE TABLE operations for large tables during off-peak hours.
+
+2. **Monitor Growth**: Keep an eye on tables that grow rapidly, as they may fragment more quickly.
+
+3. **Consider Partitioning**: For very large tables, consider partitioning to make maintenance operations more manageable.
+
+4. **Adjust innodb_file_per_table**: Ensure this is set to ON (default in modern MySQL) for better space management.
+
+"""
+
+def _parse_plan(plan_text):
+    """Parse an EXPLAIN FORMAT=JSON payload, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(plan_text)
+    return json.loads(plan_text)
+
+def _get_explain_plan(connector, query):
+    """Run EXPLAIN FORMAT=JSON for a query and parse the plan
+
+    Shared by the query tools so the EXPLAIN round trip, the error branches
+    and the JSON parse live in one place; the result rows come from the
+    query TTL cache, so chaining tools on the same query pays for one
+    EXPLAIN instead of one each.
+
+    Returns:
+        Tuple of (plan dict, None) on success or (None, error_string)
+    """
+    # Refuse writes before the round trip: EXPLAIN on a write statement
+    # still parses (and with ANALYZE would execute) it server-side
+    is_valid, error_message = validate_read_only_query(query)
+    if not is_valid:
+        return None, f"Error: {error_message}"
+
+    explain_results = connector.execute_cached_query(
+        f"EXPLAIN FORMAT=JSON {query}", None, _EXPLAIN_TTL
+    )
+
+    if not explain_results or not explain_results[0]:
+        return None, "Failed to generate execution plan for the query. The EXPLAIN command returned no results."
+    if 'EXPLAIN' not in explain_results[0]:
+        return None, f"Error: Could not find query plan in EXPLAIN results: {explain_results[0]}"
+    return _parse_plan(explain_results[0]['EXPLAIN']), None
+
+def _connect_for_tool(secret_name, region_name):
+    """Check a pooled connection out for one tool invocation
+
+    Returns (connector, None) on success, or (None, error_string) when the
+    secret name is missing or the connection cannot be established. The
+    caller returns the connector with disconnect() in its finally block.
+    """
+    if not secret_name:
+        return None, "Error: Please provide a valid AWS Secrets Manager secret name containing database credentials."
+
+    connector = MySQLConnector(
+        secret_name=secret_name,
+        region_name=region_name
+    )
+    if not connector.connect():
+        return None, f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
+    return connector, None
+
+async def _gather_explain_and_metadata(connector, secret_name, region_name,
+                                       query, tables_involved):
+    """Run EXPLAIN and the table-metadata batch concurrently
+
+    The two are independent, so they run in worker threads on two pooled
+    connections and wall time becomes the max of the two instead of their
+    sum. Falls back to serial execution on the caller's connection when a
+    second connection cannot be checked out.
+
+    Returns:
+        Tuple of ((plan dict or None, error or None),
+                  (table_stats, schema_info, index_info))
+    """
+    meta_connector = MySQLConnector(
+        secret_name=secret_name,
+        region_name=region_name
+    )
+    if await asyncio.to_thread(meta_connector.connect):
+        try:
+            return await asyncio.gather(
+                asyncio.to_thread(_get_explain_plan, connector, query),
+                asyncio.to_thread(get_table_metadata, meta_connector, tables_involved)
+            )
+        finally:
+            await asyncio.to_thread(meta_connector.disconnect)
+
+    return (await asyncio.to_thread(_get_explain_plan, connector, query),
+            await asyncio.to_thread(get_table_metadata, connector, tables_involved))
+
 def register_all_tools(mcp: FastMCP):
     """Register all tools with the MCP server"""
     
@@ -47,22 +271,16 @@ def register_all_tools(mcp: FastMCP):
         Returns:
             A comprehensive analysis of the database structure with optimization recommendations
         """
-        # Check if secret_name is provided
-        if not secret_name:
-            return "Error: Please provide a valid AWS Secrets Manager secret name containing database credentials."
-        
-        # Initialize connector with the provided secret name
-        connector = MySQLConnector(
-            secret_name=secret_name,
-            region_name=region_name
+        # Check out a pooled connection for this call
+        connector, error = await asyncio.to_thread(
+            _connect_for_tool, secret_name, region_name
         )
+        if error:
+            return error
         
         try:
-            if not connector.connect():
-                return f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
-            
             # Get comprehensive database structure
-            db_structure = get_database_structure(connector)
+            db_structure = await asyncio.to_thread(get_database_structure, connector)
             
             # Generate the formatted response
             response = analyze_database_structure_for_response(db_structure)
@@ -89,25 +307,20 @@ def register_all_tools(mcp: FastMCP):
         Returns:
             A list of slow queries with their execution statistics and analysis
         """
-        # Check if secret_name is provided
-        if not secret_name:
-            return "Error: Please provide a valid AWS Secrets Manager secret name containing database credentials."
-        
-        # Initialize connector with the provided secret name
-        connector = MySQLConnector(
-            secret_name=secret_name,
-            region_name=region_name
+        # Check out a pooled connection for this call
+        connector, error = await asyncio.to_thread(
+            _connect_for_tool, secret_name, region_name
         )
+        if error:
+            return error
         
         try:
-            if not connector.connect():
-                return f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
-            
+            # Both prerequisites sit in the server-config snapshot taken at
+            # connect() time, so the preflight costs no round trips
+            server_config = connector.server_config
+
             # Check if slow query log is enabled
-            log_status_query = "SHOW VARIABLES LIKE 'slow_query_log'"
-            log_status = connector.execute_query(log_status_query)
-            
-            if not log_status or log_status[0]['Value'].lower() != 'on':
+            if server_config.get('slow_query_log', '').lower() != 'on':
                 return """
                     The slow query log is not enabled. To enable it, run:
                     
@@ -130,10 +343,7 @@ def register_all_tools(mcp: FastMCP):
                 """
             
             # Check if performance_schema is enabled
-            perf_schema_query = "SHOW VARIABLES LIKE 'performance_schema'"
-            perf_schema = connector.execute_query(perf_schema_query)
-            
-            if not perf_schema or perf_schema[0]['Value'].lower() != 'on':
+            if server_config.get('performance_schema', '').lower() != 'on':
                 return """
                     Both slow query log and performance_schema are not enabled.
                     
@@ -164,79 +374,91 @@ def register_all_tools(mcp: FastMCP):
                     SUM_ROWS_EXAMINED/COUNT_STAR as avg_rows_examined,
                     SUM_CREATED_TMP_TABLES as tmp_tables,
                     SUM_NO_INDEX_USED as no_index_used
-                FROM 
+                FROM
                     performance_schema.events_statements_summary_by_digest
-                WHERE 
-                    AVG_TIMER_WAIT/1000000000 >= %s
-                ORDER BY 
-                    avg_exec_time_ms DESC
+                WHERE
+                    AVG_TIMER_WAIT >= %s * 1000000000
+                    AND LAST_SEEN > NOW() - INTERVAL 60 MINUTE
+                ORDER BY
+                    AVG_TIMER_WAIT DESC
                 LIMIT %s
             """
             
-            results = connector.execute_query(query, [min_execution_time, limit])
-            
+            # Companion aggregate over the same filtered digest set; SUM/MAX
+            # run in the server instead of a Python loop over fetched rows
+            summary_query = """
+                SELECT
+                    SUM(SUM_TIMER_WAIT)/1000000000 as total_time_ms,
+                    SUM(COUNT_STAR) as total_calls,
+                    MAX(MAX_TIMER_WAIT)/1000000000 as max_time_ms
+                FROM
+                    performance_schema.events_statements_summary_by_digest
+                WHERE
+                    AVG_TIMER_WAIT >= %s * 1000000000
+                    AND LAST_SEEN > NOW() - INTERVAL 60 MINUTE
+            """
+
+            # Both statements ride one round trip; params interpolate across
+            # the joined batch in order
+            result_sets = await asyncio.to_thread(
+                connector.execute_multi,
+                [query, summary_query],
+                (min_execution_time, limit, min_execution_time)
+            )
+            if len(result_sets) == 2:
+                results, summary_rows = result_sets
+            else:
+                # Batch failed; fall back to serial queries
+                results = await connector.aexecute_query(query, [min_execution_time, limit])
+                summary_rows = await connector.aexecute_query(summary_query, [min_execution_time])
+
             if not results:
                 return f"No queries found with execution time >= {min_execution_time}ms."
             
-            # Format results as markdown
-            response = f"## Slow Queries (Execution Time >= {min_execution_time}ms)\n\n"
+            # Format results as markdown; build the report as a list of
+            # fragments and join once, so large limits stay linear
+            parts = [f"## Slow Queries (Execution Time >= {min_execution_time}ms)\n\n"]
+            a = parts.append
             
-            # Extract patterns and prepare data for model analysis
+            # Totals come from the SQL aggregate; Python keeps only the
+            # query-type histogram (a cheap per-row prefix extraction)
+            summary = summary_rows[0] if summary_rows else {}
             query_patterns = {}
-            total_execution_time = 0
-            max_single_time = 0
-            total_calls = 0
-            
+
             for i, query_stat in enumerate(results, 1):
-                response += f"### Query {i}\n"
-                response += f"- **Average Execution Time**: {query_stat['avg_exec_time_ms']:.2f}ms\n"
-                response += f"- **Total Execution Time**: {query_stat['total_time_ms']:.2f}ms\n"
-                response += f"- **Calls**: {query_stat['calls']}\n"
-                response += f"- **Average Rows Returned**: {query_stat['avg_rows']}\n"
-                response += f"- **Average Rows Examined**: {query_stat['avg_rows_examined']}\n"
-                response += f"- **Max Execution Time**: {query_stat['max_time_ms']:.2f}ms\n"
-                response += f"- **Min Execution Time**: {query_stat['min_time_ms']:.2f}ms\n"
-                response += f"- **Temporary Tables Created**: {query_stat['tmp_tables']}\n"
-                response += f"- **No Index Used Count**: {query_stat['no_index_used']}\n"
-                response += f"- **SQL**: ```sql\n{query_stat['query']}\n```\n\n"
-                
                 # Analyze query complexity
                 complexity = connector.analyze_query_complexity(query_stat['query'])
-                response += "#### Complexity Analysis\n"
-                response += f"- **Complexity Score**: {complexity['complexity_score']}\n"
-                response += f"- **Join Count**: {complexity['join_count']}\n"
-                response += f"- **Subquery Count**: {complexity['subquery_count']}\n"
-                response += f"- **Aggregation Count**: {complexity['aggregation_count']}\n"
+                a(_SLOW_QUERY_ROW_TMPL.format(i=i, **query_stat, **complexity))
                 
                 if complexity['warnings']:
-                    response += "- **Warnings**:\n"
+                    a("- **Warnings**:\n")
                     for warning in complexity['warnings']:
-                        response += f"  - {warning}\n"
-                response += "\n"
-                
-                # Collect data for pattern analysis
-                total_execution_time += query_stat['total_time_ms']
-                total_calls += query_stat['calls']
-                max_single_time = max(max_single_time, query_stat['max_time_ms'])
+                        a(f"  - {warning}\n")
+                a("\n")
                 
                 # Categorize query by type (SELECT, INSERT, UPDATE, etc.)
-                query_type = query_stat['query'].strip().upper().split(' ')[0]
+                query_type = _query_head(query_stat['query'][:64])
                 if query_type not in query_patterns:
                     query_patterns[query_type] = 0
                 query_patterns[query_type] += 1
-            
+
+                # Surface per-row progress for large limits; complexity
+                # analysis of long digests makes this loop the slow part
+                if ctx:
+                    await ctx.report_progress(i, len(results))
+
             # Add summary section for model to provide insights
-            response += "## Summary Analysis\n\n"
-            response += f"- **Total Queries Analyzed**: {len(results)}\n"
-            response += f"- **Total Execution Time**: {total_execution_time:.2f}ms\n"
-            response += f"- **Total Query Calls**: {total_calls}\n"
-            response += f"- **Query Type Distribution**: {', '.join([f'{k}: {v}' for k, v in query_patterns.items()])}\n\n"
+            a("## Summary Analysis\n\n")
+            a(f"- **Total Queries Analyzed**: {len(results)}\n")
+            a(f"- **Total Execution Time**: {float(summary.get('total_time_ms') or 0):.2f}ms\n")
+            a(f"- **Total Query Calls**: {summary.get('total_calls') or 0}\n")
+            a(f"- **Query Type Distribution**: {', '.join([f'{k}: {v}' for k, v in query_patterns.items()])}\n\n")
             
             # The model will use this data to provide insights in the response
-            response += "### Key Observations\n\n"
+            a("### Key Observations\n\n")
             # This section will be filled by the model based on the data provided
             
-            return response
+            return "".join(parts)
         except Exception as e:
             return f"Error retrieving slow queries: {str(e)}"
         finally:
@@ -256,45 +478,29 @@ def register_all_tools(mcp: FastMCP):
         Returns:
             Analysis of the query execution plan and optimization suggestions
         """
-        # Check if secret_name is provided
-        if not secret_name:
-            return "Error: Please provide a valid AWS Secrets Manager secret name containing database credentials."
-        
-        # Initialize connector with the provided secret name
-        connector = MySQLConnector(
-            secret_name=secret_name,
-            region_name=region_name
+        # Check out a pooled connection for this call
+        connector, error = await asyncio.to_thread(
+            _connect_for_tool, secret_name, region_name
         )
+        if error:
+            return error
         
         try:
-            if not connector.connect():
-                return f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
-            
             # Clean the query before analysis
             query = query.strip()
-            
-            # Get the execution plan
-            explain_query = f"EXPLAIN FORMAT=JSON {query}"
-            explain_results = connector.execute_query(explain_query)
-            
-            if not explain_results or not explain_results[0]:
-                return "Failed to generate execution plan for the query. The EXPLAIN command returned no results."
-            
-            # Extract the plan JSON
-            plan_json = None
-            if 'EXPLAIN' in explain_results[0]:
-                plan_json = json.loads(explain_results[0]['EXPLAIN'])
-            else:
-                return f"Error: Could not find query plan in EXPLAIN results: {explain_results[0]}"
-            
-            # Get database structure information for tables involved in the query
+
+            # Identify the tables involved before touching the database
             tables_involved = extract_tables_from_query(query)
             if not tables_involved:
                 return "Could not identify any tables in the query. Please check the query syntax."
-                
-            table_stats = get_table_statistics(connector, tables_involved)
-            schema_info = get_schema_information(connector, tables_involved)
-            index_info = get_index_information(connector, tables_involved)
+
+            # EXPLAIN and the metadata batch are independent, so run them
+            # concurrently on two pooled connections, off the event loop
+            (plan_json, explain_error), (table_stats, schema_info, index_info) = await _gather_explain_and_metadata(
+                connector, secret_name, region_name, query, tables_involved
+            )
+            if explain_error:
+                return explain_error
             
             # Detect query patterns and anti-patterns
             patterns = detect_query_patterns(plan_json)
@@ -338,41 +544,31 @@ def register_all_tools(mcp: FastMCP):
         Returns:
             Recommended indexes to improve query performance
         """
-        # Check if secret_name is provided
-        if not secret_name:
-            return "Error: Please provide a valid AWS Secrets Manager secret name containing database credentials."
-        
-        # Initialize connector with the provided secret name
-        connector = MySQLConnector(
-            secret_name=secret_name,
-            region_name=region_name
+        # Check out a pooled connection for this call
+        connector, error = await asyncio.to_thread(
+            _connect_for_tool, secret_name, region_name
         )
+        if error:
+            return error
         
         try:
-            if not connector.connect():
-                return f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
-            
             # First, analyze the database structure to understand the context
             tables_involved = extract_tables_from_query(query)
             if not tables_involved:
                 return "Could not identify any tables in the query. Please check the query syntax."
                 
             # Get database structure for the tables involved
-            db_structure = get_table_structure_for_index(connector, tables_involved)
+            db_structure = await asyncio.to_thread(
+                get_table_structure_for_index, connector, tables_involved
+            )
             
             # Use MySQL's EXPLAIN to analyze the query
-            explain_query = f"EXPLAIN FORMAT=JSON {query}"
-            explain_results = connector.execute_query(explain_query)
-            
-            if not explain_results or not explain_results[0]:
-                return "Failed to generate execution plan for the query."
-            
-            plan_json = None
-            if 'EXPLAIN' in explain_results[0]:
-                plan_json = json.loads(explain_results[0]['EXPLAIN'])
-            else:
-                return "Failed to extract query plan from EXPLAIN results."
-            
+            plan_json, explain_error = await asyncio.to_thread(
+                _get_explain_plan, connector, query
+            )
+            if explain_error:
+                return explain_error
+
             # Extract potential index candidates using basic parsing
             potential_indexes = extract_potential_indexes(query)
             
@@ -408,42 +604,22 @@ def register_all_tools(mcp: FastMCP):
         Returns:
             Suggestions for query rewrites to improve performance
         """
-        # Check if secret_name is provided
-        if not secret_name:
-            return "Error: Please provide a valid AWS Secrets Manager secret name containing database credentials."
-        
-        # Initialize connector with the provided secret name
-        connector = MySQLConnector(
-            secret_name=secret_name,
-            region_name=region_name
+        # Check out a pooled connection for this call
+        connector, error = await asyncio.to_thread(
+            _connect_for_tool, secret_name, region_name
         )
+        if error:
+            return error
         
         try:
-            if not connector.connect():
-                return f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
-            
-            # Get the execution plan
-            explain_query = f"EXPLAIN FORMAT=JSON {query}"
-            explain_results = connector.execute_query(explain_query)
-            
-            if not explain_results or not explain_results[0]:
-                return "Failed to generate execution plan for the query."
-            
-            plan_json = None
-            if 'EXPLAIN' in explain_results[0]:
-                plan_json = json.loads(explain_results[0]['EXPLAIN'])
-            else:
-                return "Failed to extract query plan from EXPLAIN results."
-            
-            # Get schema information for tables in the query
+            # EXPLAIN and the metadata batch are independent, so run them
+            # concurrently on two pooled connections, off the event loop
             tables_involved = extract_tables_from_query(query)
-            schema_info = get_schema_information(connector, tables_involved)
-            
-            # Get table statistics
-            table_stats = get_table_statistics(connector, tables_involved)
-            
-            # Get index information
-            index_info = get_index_information(connector, tables_involved)
+            (plan_json, explain_error), (table_stats, schema_info, index_info) = await _gather_explain_and_metadata(
+                connector, secret_name, region_name, query, tables_involved
+            )
+            if explain_error:
+                return explain_error
             
             # Analyze the query for common anti-patterns
             anti_patterns = detect_query_anti_patterns(query)
@@ -451,71 +627,79 @@ def register_all_tools(mcp: FastMCP):
             # Analyze query complexity
             complexity = connector.analyze_query_complexity(query)
             
-            # Format the response
-            response = "## Query Rewrite Suggestions\n\n"
+            # Format the response as joined fragments; += on a growing
+            # string copies all prior bytes on every append
+            parts = ["## Query Rewrite Suggestions\n\n"]
+            a = parts.append
             
             # Add query complexity analysis
-            response += "### Query Complexity Analysis\n"
-            response += f"- **Complexity Score**: {complexity['complexity_score']}\n"
-            response += f"- **Join Count**: {complexity['join_count']}\n"
-            response += f"- **Subquery Count**: {complexity['subquery_count']}\n"
-            response += f"- **Aggregation Count**: {complexity['aggregation_count']}\n"
+            a(_COMPLEXITY_TMPL.format(**complexity))
             
             if complexity['warnings']:
-                response += "- **Warnings**:\n"
+                a("- **Warnings**:\n")
                 for warning in complexity['warnings']:
-                    response += f"  - {warning}\n"
-            response += "\n"
-            
+                    a(f"  - {warning}\n")
+            a("\n")
+            
+            # Index the metadata by table once so the per-table sections below
+            # cost a hash lookup each instead of a scan over every row
+            stats_by_table = {t['table_name']: t for t in table_stats if 'table_name' in t}
+            cols_by_table = defaultdict(list)
+            for col in schema_info:
+                cols_by_table[col.get('table_name')].append(col)
+            indexes_by_table = defaultdict(list)
+            for idx in index_info:
+                indexes_by_table[idx.get('table_name')].append(idx)
+
             # Add database context
-            response += "### Database Context\n\n"
+            a("### Database Context\n\n")
             for table in tables_involved:
-                table_info = next((t for t in table_stats if t.get('table_name') == table), None)
+                table_info = stats_by_table.get(table)
                 if table_info:
-                    response += f"**Table**: `{table}`\n"
-                    response += f"- **Rows**: {table_info.get('table_rows', 'Unknown')}\n"
-                    response += f"- **Data Size**: {format_bytes(table_info.get('data_length', 0))}\n"
-                    response += f"- **Index Size**: {format_bytes(table_info.get('index_length', 0))}\n\n"
+                    a(f"**Table**: `{table}`\n")
+                    a(f"- **Rows**: {table_info.get('table_rows', 'Unknown')}\n")
+                    a(f"- **Data Size**: {format_bytes(table_info.get('data_length', 0))}\n")
+                    a(f"- **Index Size**: {format_bytes(table_info.get('index_length', 0))}\n\n")
             
             # Add schema information
-            response += "### Schema Information\n\n"
+            a("### Schema Information\n\n")
             for table in tables_involved:
-                table_columns = [col for col in schema_info if col.get('table_name') == table]
+                table_columns = cols_by_table.get(table, [])
                 if table_columns:
-                    response += f"**Table**: `{table}`\n"
+                    a(f"**Table**: `{table}`\n")
                     for col in table_columns:
                         nullable = "NULL" if col.get('is_nullable') == 'YES' else "NOT NULL"
-                        response += f"- `{col.get('column_name')}` ({col.get('column_type')}, {nullable})\n"
-                    response += "\n"
+                        a(f"- `{col.get('column_name')}` ({col.get('column_type')}, {nullable})\n")
+                    a("\n")
             
             # Add index information
-            response += "### Index Information\n\n"
+            a("### Index Information\n\n")
             for table in tables_involved:
-                table_indexes = [idx for idx in index_info if idx.get('table_name') == table]
+                table_indexes = indexes_by_table.get(table, [])
                 if table_indexes:
-                    response += f"**Table**: `{table}`\n"
+                    a(f"**Table**: `{table}`\n")
                     for idx in table_indexes:
                         unique = "Unique" if idx.get('non_unique') == 0 else "Non-Unique"
-                        response += f"- `{idx.get('index_name')}`: {idx.get('columns')} ({idx.get('index_type')}, {unique})\n"
-                    response += "\n"
+                        a(f"- `{idx.get('index_name')}`: {idx.get('columns')} ({idx.get('index_type')}, {unique})\n")
+                    a("\n")
                 else:
-                    response += f"**Table**: `{table}` - No indexes found\n\n"
+                    a(f"**Table**: `{table}` - No indexes found\n\n")
             
             # Add anti-pattern analysis
             if anti_patterns:
-                response += "### Detected Anti-Patterns\n\n"
+                a("### Detected Anti-Patterns\n\n")
                 for i, issue in enumerate(anti_patterns, 1):
-                    response += f"#### Issue {i}: {issue['issue']}\n"
-                    response += f"{issue['description']}\n\n"
-                    response += f"**Suggestion**: {issue['suggestion']}\n"
+                    a(f"#### Issue {i}: {issue['issue']}\n")
+                    a(f"{issue['description']}\n\n")
+                    a(f"**Suggestion**: {issue['suggestion']}\n")
                     if "example" in issue and issue["example"]:
-                        response += f"**Example**: ```sql\n{issue['example']}\n```\n\n"
+                        a(f"**Example**: ```sql\n{issue['example']}\n```\n\n")
             else:
-                response += "### Detected Anti-Patterns\n\n"
-                response += "No obvious anti-patterns detected in the query.\n\n"
+                a("### Detected Anti-Patterns\n\n")
+                a("No obvious anti-patterns detected in the query.\n\n")
             
             # Add execution plan summary
-            response += "### Execution Plan Summary\n\n"
+            a("### Execution Plan Summary\n\n")
             try:
                 if "query_block" in plan_json:
                     query_block = plan_json["query_block"]
@@ -533,25 +717,25 @@ def register_all_tools(mcp: FastMCP):
                                 table_scans.append(table.get("table_name", "Unknown"))
                     
                     if table_scans:
-                        response += "- **Full Table Scans**: " + ", ".join([f"`{t}`" for t in table_scans]) + "\n"
+                        a("- **Full Table Scans**: " + ", ".join([f"`{t}`" for t in table_scans]) + "\n")
                     
                     # Check for temporary tables
                     if "temporary_table" in query_block:
-                        response += "- **Uses Temporary Table**: Yes\n"
+                        a("- **Uses Temporary Table**: Yes\n")
                     
                     # Check for filesorts
                     if "ordering_operation" in query_block:
-                        response += "- **Uses Filesort**: Yes\n"
+                        a("- **Uses Filesort**: Yes\n")
             except Exception as e:
-                response += f"Error parsing execution plan: {str(e)}\n"
+                a(f"Error parsing execution plan: {str(e)}\n")
             
-            response += "\n"
+            a("\n")
             
             # The model will use the provided data to generate query rewrite suggestions
-            response += "## Recommended Query Rewrites\n\n"
+            a("## Recommended Query Rewrites\n\n")
             # This section will be filled by the model based on the data provided
             
-            return response
+            return "".join(parts)
         except Exception as e:
             return f"Error generating query rewrite suggestions: {str(e)}"
         finally:
@@ -559,31 +743,28 @@ def register_all_tools(mcp: FastMCP):
             connector.disconnect()
     
     @mcp.tool()
-    async def analyze_innodb_buffer_pool(secret_name: str = None, region_name: str = "us-west-2", ctx: Context = None) -> str:
+    async def analyze_innodb_buffer_pool(secret_name: str = None, region_name: str = "us-west-2",
+                                         deep: bool = False, ctx: Context = None) -> str:
         """
         Analyze InnoDB buffer pool usage and provide optimization recommendations.
-        
+
         Args:
             secret_name: AWS Secrets Manager secret name containing database credentials (required)
             region_name: AWS region where the secret is stored (default: us-west-2)
-        
+            deep: Include the buffer-page LRU join for exact per-table page
+                counts; slow on servers with large buffer pools (default: False)
+
         Returns:
             Analysis of InnoDB buffer pool usage with recommendations
         """
-        # Check if secret_name is provided
-        if not secret_name:
-            return "Error: Please provide a valid AWS Secrets Manager secret name containing database credentials."
-        
-        # Initialize connector with the provided secret name
-        connector = MySQLConnector(
-            secret_name=secret_name,
-            region_name=region_name
+        # Check out a pooled connection for this call
+        connector, error = await asyncio.to_thread(
+            _connect_for_tool, secret_name, region_name
         )
+        if error:
+            return error
         
         try:
-            if not connector.connect():
-                return f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
-            
             # Get buffer pool size and configuration
             buffer_config_query = """
                 SHOW VARIABLES WHERE Variable_name IN (
@@ -593,14 +774,18 @@ def register_all_tools(mcp: FastMCP):
                     'innodb_page_size'
                 )
             """
-            buffer_config = connector.execute_query(buffer_config_query)
-            
-            # Get buffer pool status
+            # Get buffer pool status; name the five counters the analysis
+            # reads rather than pulling every Innodb_buffer_pool% row
             buffer_status_query = """
-                SHOW STATUS WHERE Variable_name LIKE 'Innodb_buffer_pool%'
+                SHOW GLOBAL STATUS WHERE Variable_name IN (
+                    'Innodb_buffer_pool_pages_total',
+                    'Innodb_buffer_pool_pages_free',
+                    'Innodb_buffer_pool_pages_data',
+                    'Innodb_buffer_pool_read_requests',
+                    'Innodb_buffer_pool_reads'
+                )
             """
-            buffer_status = connector.execute_query(buffer_status_query)
-            
+
             # Get server memory information
             memory_query = """
                 SHOW VARIABLES WHERE Variable_name IN (
@@ -611,41 +796,96 @@ def register_all_tools(mcp: FastMCP):
                     'tmp_table_size'
                 )
             """
-            memory_info = connector.execute_query(memory_query)
-            
-            # Get buffer pool content by table
-            buffer_content_query = """
-                SELECT 
-                    table_name,
-                    index_name,
-                    count(*) as page_count,
-                    sum(data_size)/1024/1024 as data_size_mb
-                FROM 
-                    information_schema.innodb_buffer_page
-                JOIN 
-                    information_schema.innodb_buffer_page_lru USING (pool_id, block_id)
-                WHERE 
-                    table_name IS NOT NULL AND table_name != ''
-                GROUP BY 
-                    table_name, index_name
-                ORDER BY 
-                    page_count DESC
-                LIMIT 20
-            """
+
+            # Get buffer pool content by table. The LRU join materializes
+            # metadata for every page in the pool and can stall a loaded
+            # server for seconds, so it only runs when deep=True; the default
+            # reads innodb_buffer_page alone. Either way the optimizer hint
+            # caps the query at 5s so it cannot run away
+            if deep:
+                buffer_content_query = """
+                    SELECT /*+ MAX_EXECUTION_TIME(5000) */
+                        table_name,
+                        index_name,
+                        count(*) as page_count,
+                        sum(data_size)/1024/1024 as data_size_mb
+                    FROM
+                        information_schema.innodb_buffer_page
+                    JOIN
+                        information_schema.innodb_buffer_page_lru USING (pool_id, block_id)
+                    WHERE
+                        table_name IS NOT NULL AND table_name != ''
+                    GROUP BY
+                        table_name, index_name
+                    ORDER BY
+                        page_count DESC
+                    LIMIT 20
+                """
+            else:
+                buffer_content_query = """
+                    SELECT /*+ MAX_EXECUTION_TIME(5000) */
+                        table_name,
+                        index_name,
+                        count(*) as page_count,
+                        sum(data_size)/1024/1024 as data_size_mb
+                    FROM
+                        information_schema.innodb_buffer_page
+                    WHERE
+                        table_name IS NOT NULL AND table_name != ''
+                    GROUP BY
+                        table_name, index_name
+                    ORDER BY
+                        page_count DESC
+                    LIMIT 20
+                """
             
-            try:
-                buffer_content = connector.execute_query(buffer_content_query)
-            except Exception:
-                buffer_content = []
-                # This query might fail on some MySQL versions or configurations
+            async def fetch_content(conn):
+                try:
+                    return await conn.aexecute_query(buffer_content_query)
+                except Exception:
+                    # This query might fail on some MySQL versions or configurations
+                    return []
+
+            async def fetch_snapshots():
+                # The three SHOW snapshots ride one round trip
+                result_sets = await asyncio.to_thread(
+                    connector.execute_multi,
+                    [buffer_config_query, buffer_status_query, memory_query]
+                )
+                if len(result_sets) == 3:
+                    return result_sets
+                # Batch failed; fall back to serial queries
+                return [await connector.aexecute_query(buffer_config_query),
+                        await connector.aexecute_query(buffer_status_query),
+                        await connector.aexecute_query(memory_query)]
+
+            # The snapshot batch and the page scan are independent, so run
+            # them on two pooled connections and pay the slower of the two;
+            # without a second connection they run serially as before
+            content_connector = MySQLConnector(
+                secret_name=secret_name,
+                region_name=region_name
+            )
+            if await asyncio.to_thread(content_connector.connect):
+                try:
+                    (buffer_config, buffer_status, memory_info), buffer_content = \
+                        await asyncio.gather(fetch_snapshots(),
+                                             fetch_content(content_connector))
+                finally:
+                    content_connector.disconnect()
+            else:
+                buffer_config, buffer_status, memory_info = await fetch_snapshots()
+                buffer_content = await fetch_content(connector)
             
-            # Format the response
-            response = "# InnoDB Buffer Pool Analysis\n\n"
+            # Format the response as joined fragments; += on a growing
+            # string recopies it per append
+            parts = ["# InnoDB Buffer Pool Analysis\n\n"]
+            a = parts.append
             
             # Buffer pool configuration
-            response += "## Buffer Pool Configuration\n\n"
-            response += "| Parameter | Value | Size |\n"
-            response += "| --------- | ----- | ---- |\n"
+            a("## Buffer Pool Configuration\n\n")
+            a("| Parameter | Value | Size |\n")
+            a("| --------- | ----- | ---- |\n")
             
             buffer_pool_size = 0
             page_size = 16384  # Default
@@ -663,100 +903,78 @@ def register_all_tools(mcp: FastMCP):
                 else:
                     size_str = value
                 
-                response += f"| {name} | {value} | {size_str} |\n"
+                a(f"| {name} | {value} | {size_str} |\n")
             
-            response += "\n"
+            a("\n")
             
             # Buffer pool status
-            response += "## Buffer Pool Status\n\n"
-            
-            # Extract key metrics
-            pages_total = 0
-            pages_free = 0
-            pages_data = 0
-            read_requests = 0
-            reads = 0
+            a("## Buffer Pool Status\n\n")
             
-            for status in buffer_status:
-                if status["Variable_name"] == "Innodb_buffer_pool_pages_total":
-                    pages_total = int(status["Value"])
-                elif status["Variable_name"] == "Innodb_buffer_pool_pages_free":
-                    pages_free = int(status["Value"])
-                elif status["Variable_name"] == "Innodb_buffer_pool_pages_data":
-                    pages_data = int(status["Value"])
-                elif status["Variable_name"] == "Innodb_buffer_pool_read_requests":
-                    read_requests = int(status["Value"])
-                elif status["Variable_name"] == "Innodb_buffer_pool_reads":
-                    reads = int(status["Value"])
+            # Extract key metrics; the query returns exactly these rows, so
+            # index the small result instead of branching per row
+            status_vals = {row["Variable_name"]: int(row["Value"]) for row in buffer_status}
+            pages_total = status_vals.get("Innodb_buffer_pool_pages_total", 0)
+            pages_free = status_vals.get("Innodb_buffer_pool_pages_free", 0)
+            pages_data = status_vals.get("Innodb_buffer_pool_pages_data", 0)
+            read_requests = status_vals.get("Innodb_buffer_pool_read_requests", 0)
+            reads = status_vals.get("Innodb_buffer_pool_reads", 0)
             
             # Calculate derived metrics
             buffer_pool_used_pct = ((pages_total - pages_free) / pages_total) * 100 if pages_total > 0 else 0
             hit_ratio = ((read_requests - reads) / read_requests) * 100 if read_requests > 0 else 0
             
-            response += f"- **Buffer Pool Size**: {format_bytes(buffer_pool_size)}\n"
-            response += f"- **Total Pages**: {pages_total:,}\n"
-            response += f"- **Free Pages**: {pages_free:,}\n"
-            response += f"- **Data Pages**: {pages_data:,}\n"
-            response += f"- **Buffer Pool Used**: {buffer_pool_used_pct:.2f}%\n"
-            response += f"- **Read Requests**: {read_requests:,}\n"
-            response += f"- **Physical Reads**: {reads:,}\n"
-            response += f"- **Hit Ratio**: {hit_ratio:.2f}%\n\n"
+            a(f"- **Buffer Pool Size**: {format_bytes(buffer_pool_size)}\n")
+            a(f"- **Total Pages**: {pages_total:,}\n")
+            a(f"- **Free Pages**: {pages_free:,}\n")
+            a(f"- **Data Pages**: {pages_data:,}\n")
+            a(f"- **Buffer Pool Used**: {buffer_pool_used_pct:.2f}%\n")
+            a(f"- **Read Requests**: {read_requests:,}\n")
+            a(f"- **Physical Reads**: {reads:,}\n")
+            a(f"- **Hit Ratio**: {hit_ratio:.2f}%\n\n")
             
             # Buffer pool content
             if buffer_content:
-                response += "## Top Tables in Buffer Pool\n\n"
-                response += "| Table | Index | Pages | Data Size |\n"
-                response += "| ----- | ----- | ----- | --------- |\n"
+                a("## Top Tables in Buffer Pool\n\n")
+                a("| Table | Index | Pages | Data Size |\n")
+                a("| ----- | ----- | ----- | --------- |\n")
                 
-                for item in buffer_content:
-                    table = item["table_name"]
-                    index = item["index_name"] or "PRIMARY"
-                    pages = item["page_count"]
-                    size = f"{item['data_size_mb']:.2f} MB"
-                    
-                    response += f"| {table} | {index} | {pages:,} | {size} |\n"
-                
-                response += "\n"
+                # The query already caps the scan at its top 20 rows, so one
+                # f-string per row joined into a single fragment suffices
+                a("".join(
+                    f"| {item['table_name']} | {item['index_name'] or 'PRIMARY'} "
+                    f"| {item['page_count']:,} | {item['data_size_mb']:.2f} MB |\n"
+                    for item in buffer_content
+                ))
+                a("\n")
             
             # Recommendations
-            response += "## Recommendations\n\n"
+            a("## Recommendations\n\n")
             
             # Buffer pool size recommendations
             if buffer_pool_used_pct > 95:
-                response += "### Buffer Pool Size\n\n"
-                response += "The buffer pool is nearly full (>95% used). Consider increasing the buffer pool size if server has available memory.\n\n"
-                response += "```sql\n"
-                response += f"SET GLOBAL innodb_buffer_pool_size = {buffer_pool_size * 2};\n"
-                response += "```\n\n"
-                response += "For permanent changes, update your my.cnf file:\n\n"
-                response += "```\n"
-                response += f"innodb_buffer_pool_size = {format_bytes(buffer_pool_size * 2)}\n"
-                response += "```\n\n"
+                new_size = buffer_pool_size * 2
+                a(_BP_RESIZE_TMPL.format(
+                    reason="The buffer pool is nearly full (>95% used). Consider increasing the buffer pool size if server has available memory.",
+                    new_size=new_size,
+                    new_size_h=format_bytes(new_size)
+                ))
             elif buffer_pool_used_pct < 50:
-                response += "### Buffer Pool Size\n\n"
-                response += "The buffer pool is less than 50% used. You might be able to reduce the buffer pool size to free memory for other purposes.\n\n"
-                response += "```sql\n"
-                response += f"SET GLOBAL innodb_buffer_pool_size = {buffer_pool_size // 2};\n"
-                response += "```\n\n"
-                response += "For permanent changes, update your my.cnf file:\n\n"
-                response += "```\n"
-                response += f"innodb_buffer_pool_size = {format_bytes(buffer_pool_size // 2)}\n"
-                response += "```\n\n"
+                new_size = buffer_pool_size // 2
+                a(_BP_RESIZE_TMPL.format(
+                    reason="The buffer pool is less than 50% used. You might be able to reduce the buffer pool size to free memory for other purposes.",
+                    new_size=new_size,
+                    new_size_h=format_bytes(new_size)
+                ))
             
             # Hit ratio recommendations
             if hit_ratio < 95:
-                response += "### Hit Ratio\n\n"
-                response += f"The buffer pool hit ratio is {hit_ratio:.2f}%, which is below the recommended 95%. This indicates that MySQL is reading from disk more often than optimal.\n\n"
-                response += "Consider:\n"
-                response += "1. Increasing the buffer pool size if memory is available\n"
-                response += "2. Optimizing queries to reduce the working set size\n"
-                response += "3. Adding appropriate indexes to reduce full table scans\n\n"
+                a(_BP_HIT_RATIO_TMPL.format(hit_ratio=hit_ratio))
             
             # The model will use the provided data to generate additional recommendations
-            response += "### Additional Recommendations\n\n"
+            a("### Additional Recommendations\n\n")
             # This section will be filled by the model based on the data provided
             
-            return response
+            return "".join(parts)
         except Exception as e:
             return f"Error analyzing InnoDB buffer pool: {str(e)}"
         finally:
@@ -775,21 +993,17 @@ def register_all_tools(mcp: FastMCP):
         Returns:
             Analysis of table fragmentation with optimization recommendations
         """
-        # Check if secret_name is provided
-        if not secret_name:
-            return "Error: Please provide a valid AWS Secrets Manager secret name containing database credentials."
-        
-        # Initialize connector with the provided secret name
-        connector = MySQLConnector(
-            secret_name=secret_name,
-            region_name=region_name
+        # Check out a pooled connection for this call
+        connector, error = await asyncio.to_thread(
+            _connect_for_tool, secret_name, region_name
         )
+        if error:
+            return error
         
         try:
-            if not connector.connect():
-                return f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
-            
-            # Get table information
+            # Get table information for the overview, capped to the 100
+            # largest tables so a many-thousand-table schema does not ship
+            # megabytes of metadata for a report nobody scrolls
             tables_query = """
                 SELECT 
                     table_name,
@@ -807,80 +1021,111 @@ def register_all_tools(mcp: FastMCP):
                     AND engine = 'InnoDB'
                 ORDER BY 
                     data_length DESC
+                LIMIT 100
             """
-            tables = connector.execute_query(tables_query)
+
+            # The recommendation set is filtered server-side (>10% estimated
+            # fragmentation and >10MB of data), so it covers every table in
+            # the schema even when the overview is capped
+            fragmented_query = """
+                SELECT
+                    table_name,
+                    data_length,
+                    (data_free / NULLIF(data_length + index_length, 0)) * 100
+                        AS fragmentation_pct
+                FROM
+                    information_schema.tables
+                WHERE
+                    table_schema = DATABASE()
+                    AND engine = 'InnoDB'
+                    AND data_length > 10485760
+                    AND (data_free / NULLIF(data_length + index_length, 0)) > 0.10
+                ORDER BY
+                    fragmentation_pct DESC
+            """
+
+            # Both queries ride one round trip
+            result_sets = await asyncio.to_thread(
+                connector.execute_multi, [tables_query, fragmented_query]
+            )
+            if len(result_sets) == 2:
+                tables, fragmented_rows = result_sets
+            else:
+                # Batch failed; fall back to serial queries
+                tables = await connector.aexecute_query(tables_query)
+                fragmented_rows = await connector.aexecute_query(fragmented_query)
             
-            # Format the response
-            response = "# Table Fragmentation Analysis\n\n"
+            # Format the response as joined fragments
+            parts = ["# Table Fragmentation Analysis\n\n"]
+            a = parts.append
             
             if not tables:
-                return response + "No InnoDB tables found in the current database."
+                return parts[0] + "No InnoDB tables found in the current database."
             
             # Table fragmentation overview
-            response += "## Table Fragmentation Overview\n\n"
-            response += "| Table | Rows | Data Size | Index Size | Free Space | Fragmentation % |\n"
-            response += "| ----- | ---- | --------- | ---------- | ---------- | -------------- |\n"
-            
-            fragmented_tables = []
-            
+            a("## Table Fragmentation Overview\n\n")
+            a("| Table | Rows | Data Size | Index Size | Free Space | Fragmentation % |\n")
+            a("| ----- | ---- | --------- | ---------- | ---------- | -------------- |\n")
+            
+            # One pass derives the per-table numbers; rows render as a single
+            # f-string each and the filter reuses the same tuples instead of
+            # redoing the arithmetic
+            stats = []
             for table in tables:
-                table_name = table["table_name"]
-                rows = table["table_rows"] or 0
                 data_length = table["data_length"] or 0
                 index_length = table["index_length"] or 0
                 data_free = table["data_free"] or 0
-                
-                # Calculate fragmentation percentage
                 total_size = data_length + index_length
-                fragmentation_pct = (data_free / total_size) * 100 if total_size > 0 else 0
-                
-                # Format sizes
-                data_size = format_bytes(data_length)
-                index_size = format_bytes(index_length)
-                free_space = format_bytes(data_free)
-                
-                response += f"| {table_name} | {rows:,} | {data_size} | {index_size} | {free_space} | {fragmentation_pct:.2f}% |\n"
-                
-                # Track tables with significant fragmentation
-                if fragmentation_pct > 10 and data_length > 10 * 1024 * 1024:  # >10% fragmentation and >10MB
-                    fragmented_tables.append({
-                        "name": table_name,
-                        "fragmentation": fragmentation_pct,
-                        "size": data_length
-                    })
-            
-            response += "\n"
+                stats.append((
+                    table["table_name"],
+                    table["table_rows"] or 0,
+                    data_length,
+                    index_length,
+                    data_free,
+                    (data_free / total_size) * 100 if total_size > 0 else 0,
+                ))
+
+            a("".join(
+                f"| {name} | {rows:,} | {format_bytes(data_length)} | "
+                f"{format_bytes(index_length)} | {format_bytes(data_free)} | "
+                f"{fragmentation_pct:.2f}% |\n"
+                for name, rows, data_length, index_length, data_free,
+                    fragmentation_pct in stats
+            ))
+
+            # Significant fragmentation came pre-filtered from the server
+            fragmented_tables = [
+                {"name": row['table_name'],
+                 "fragmentation": float(row['fragmentation_pct'] or 0),
+                 "size": row['data_length']}
+                for row in fragmented_rows
+            ]
+
+            a("\n")
             
             # Recommendations for fragmented tables
             if fragmented_tables:
-                response += "## Optimization Recommendations\n\n"
-                response += "The following tables have significant fragmentation and could benefit from optimization:\n\n"
+                a("## Optimization Recommendations\n\n")
+                a("The following tables have significant fragmentation and could benefit from optimization:\n\n")
                 
                 for table in fragmented_tables:
-                    response += f"### {table['name']}\n\n"
-                    response += f"- **Fragmentation**: {table['fragmentation']:.2f}%\n"
-                    response += f"- **Size**: {format_bytes(table['size'])}\n"
-                    response += "- **Recommendation**: Run OPTIMIZE TABLE to defragment and reclaim space\n\n"
-                    response += "```sql\n"
-                    response += f"OPTIMIZE TABLE {table['name']};\n"
-                    response += "```\n\n"
-                    response += "Note: OPTIMIZE TABLE locks the table during operation. Consider running during off-peak hours.\n\n"
+                    a(_FRAG_TABLE_TMPL.format(
+                        name=table['name'],
+                        fragmentation=table['fragmentation'],
+                        size_h=format_bytes(table['size'])
+                    ))
             else:
-                response += "## Optimization Recommendations\n\n"
-                response += "No tables with significant fragmentation were detected. Your database appears to be well-optimized in terms of storage.\n\n"
+                a("## Optimization Recommendations\n\n")
+                a("No tables with significant fragmentation were detected. Your database appears to be well-optimized in terms of storage.\n\n")
             
             # General recommendations
-            response += "## General Recommendations\n\n"
-            response += "1. **Regular Maintenance**: Schedule regular OPTIMIZE TABLE operations for large tables during off-peak hours.\n\n"
-            response += "2. **Monitor Growth**: Keep an eye on tables that grow rapidly, as they may fragment more quickly.\n\n"
-            response += "3. **Consider Partitioning**: For very large tables, consider partitioning to make maintenance operations more manageable.\n\n"
-            response += "4. **Adjust innodb_file_per_table**: Ensure this is set to ON (default in modern MySQL) for better space management.\n\n"
+            a(_FRAG_GENERAL_RECS)
             
             # The model will use the provided data to generate additional recommendations
-            response += "## Additional Insights\n\n"
+            a("## Additional Insights\n\n")
             # This section will be filled by the model based on the data provided
             
-            return response
+            return "".join(parts)
         except Exception as e:
             return f"Error analyzing table fragmentation: {str(e)}"
         finally:
@@ -905,74 +1150,73 @@ def register_all_tools(mcp: FastMCP):
             show_mysql_settings(pattern="innodb", secret_name="my-db-secret")
             show_mysql_settings(pattern="buffer", secret_name="my-db-secret")
         """
-        # Check if secret_name is provided
-        if not secret_name:
-            return "Error: Please provide a valid AWS Secrets Manager secret name containing database credentials."
-        
-        # Initialize connector with the provided secret name
-        connector = MySQLConnector(
-            secret_name=secret_name,
-            region_name=region_name
+        # Check out a pooled connection for this call
+        connector, error = await asyncio.to_thread(
+            _connect_for_tool, secret_name, region_name
         )
+        if error:
+            return error
         
         try:
-            if not connector.connect():
-                return f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
-            
-            # Build the query based on whether a pattern is provided
-            if pattern:
-                query = f"SHOW VARIABLES WHERE Variable_name LIKE '%{pattern}%'"
-            else:
-                query = "SHOW VARIABLES"
-            
-            results = connector.execute_query(query)
-            
+            # performance_schema.global_variables supports WHERE/ORDER BY
+            # pushdown (SHOW VARIABLES does not), so the server returns the
+            # rows filtered and sorted; the pattern binds as a parameter
+            query = """
+                SELECT
+                    VARIABLE_NAME AS Variable_name,
+                    VARIABLE_VALUE AS Value
+                FROM
+                    performance_schema.global_variables
+                WHERE
+                    VARIABLE_NAME LIKE %s
+                ORDER BY
+                    VARIABLE_NAME
+            """
+            # Tuple rows: ~600 settings consumed positionally don't need a
+            # dict built per row
+            results = await connector.aexecute_query(
+                query, [f"%{pattern}%" if pattern else "%"], dict_rows=False
+            )
+
             if not results:
                 if pattern:
                     return f"No settings found matching pattern '{pattern}'."
                 else:
                     return "No settings found."
-            
-            # Group settings by prefix for better organization
-            settings_by_prefix = {}
+
+            # Group settings by prefix for better organization; the stream
+            # arrives name-sorted, so each group list is already in order
+            settings_by_prefix = defaultdict(list)
             for setting in results:
-                name = setting['Variable_name']
+                name = setting[0]
                 prefix = name.split('_')[0] if '_' in name else 'other'
-                
-                if prefix not in settings_by_prefix:
-                    settings_by_prefix[prefix] = []
                 settings_by_prefix[prefix].append(setting)
             
-            # Format the response
-            response = "# MySQL Configuration Settings\n\n"
+            # Format the response as joined fragments
+            parts = ["# MySQL Configuration Settings\n\n"]
+            a = parts.append
             
             if pattern:
-                response += f"Showing settings matching pattern: '{pattern}'\n\n"
+                a(f"Showing settings matching pattern: '{pattern}'\n\n")
             
             for prefix, settings in sorted(settings_by_prefix.items()):
-                response += f"## {prefix.upper()}\n\n"
-                response += "| Name | Value |\n"
-                response += "| ---- | ----- |\n"
+                a(f"## {prefix.upper()}\n\n")
+                a("| Name | Value |\n")
+                a("| ---- | ----- |\n")
                 
-                for setting in sorted(settings, key=lambda x: x['Variable_name']):
-                    name = setting['Variable_name']
-                    value = setting['Value']
+                for name, value in settings:
+                    # Format byte values for better readability; isdigit()
+                    # makes the int() conversion safe without a try/except
+                    if _SIZE_SETTING_RE.search(name) and value.isdigit() and int(value) > 1024:
+                        value = f"{value} ({format_bytes(int(value))})"
                     
-                    # Format byte values for better readability
-                    if any(size_param in name.lower() for size_param in ['size', 'buffer', 'cache', 'length']):
-                        try:
-                            if value.isdigit() and int(value) > 1024:
-                                value = f"{value} ({format_bytes(int(value))})"
-                        except:
-                            pass
-                    
-                    response += f"| {name} | {value} |\n"
+                    a(f"| {name} | {value} |\n")
                 
-                response += "\n"
+                a("\n")
             
-            response += f"\n{len(results)} setting(s) displayed."
+            a(f"\n{len(results)} setting(s) displayed.")
             
-            return response
+            return "".join(parts)
         except Exception as e:
             return f"Error retrieving MySQL settings: {str(e)}"
         finally:
@@ -981,7 +1225,8 @@ def register_all_tools(mcp: FastMCP):
     
     @mcp.tool()
     async def execute_read_only_query(query: str, secret_name: str = None, region_name: str = "us-west-2", 
-                                     max_rows: int = 100, ctx: Context = None) -> str:
+                                     max_rows: int = 100, nocache: bool = False,
+                                     debug: bool = False, ctx: Context = None) -> str:
         """
         Execute a read-only SQL query and return the results.
         
@@ -990,6 +1235,10 @@ def register_all_tools(mcp: FastMCP):
             secret_name: AWS Secrets Manager secret name containing database credentials (required)
             region_name: AWS region where the secret is stored (default: us-west-2)
             max_rows: Maximum number of rows to return (default: 100)
+            nocache: Bypass the short-lived result cache and always hit the
+                server (default: False)
+            debug: Include the full traceback in error responses
+                (default: False)
         
         Returns:
             Query results in a formatted table
@@ -1000,32 +1249,49 @@ def register_all_tools(mcp: FastMCP):
             execute_read_only_query("SHOW VARIABLES LIKE 'innodb%'", secret_name="my-db-secret")
             execute_read_only_query("SHOW STATUS", secret_name="my-db-secret")
         """
-        # Check if secret_name is provided
-        if not secret_name:
-            return "Error: Please provide a valid AWS Secrets Manager secret name containing database credentials."
-        
         # Validate that this is a read-only query
         is_valid, error_message = validate_read_only_query(query)
         if not is_valid:
             return f"Error: {error_message}"
         
-        # Initialize connector with the provided secret name
-        connector = MySQLConnector(
-            secret_name=secret_name,
-            region_name=region_name
+        # Check out a pooled connection for this call
+        connector, error = await asyncio.to_thread(
+            _connect_for_tool, secret_name, region_name
         )
+        if error:
+            return error
         
         try:
-            if not connector.connect():
-                return f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
-            
-            # Set session to read-only mode
-            connector.execute_query("SET SESSION TRANSACTION READ ONLY")
-            connector.execute_query("SET SESSION MAX_EXECUTION_TIME=30000")  # 30-second timeout for safety
-            
-            # Execute the query
+            # Session is already read-only with a 30s statement timeout:
+            # connect() applies both in one SET per physical connection and
+            # the pool keeps the session settings across checkouts
+
+            # Push the row cap into the statement so the server stops
+            # producing rows early instead of shipping the full result for a
+            # Python-side slice; the +1 keeps truncation detectable. EXPLAIN
+            # and SHOW cannot be wrapped and stay as-is, and neither can a
+            # SELECT whose last line carries a -- or # comment — the comment
+            # would consume the derived table's closing paren
+            run_query = query
+            bare_query = query.rstrip().rstrip(';')
+            if (_query_head(query[:64]) == 'SELECT'
+                    and not _TRAILING_LIMIT_RE.search(query)
+                    and not _TRAILING_LINE_COMMENT_RE.search(bare_query)):
+                run_query = (
+                    f"SELECT * FROM ({bare_query}) _sub "
+                    f"LIMIT {max_rows + 1}"
+                )
+
+            # Execute the query. Agents tend to re-run the same probe
+            # several times in a session, so identical statements serve from
+            # the shared TTL cache unless the caller opts out
             start_time = time.time()
-            results = connector.execute_query(query)
+            if nocache:
+                results = await connector.aexecute_query(run_query)
+            else:
+                results = await asyncio.to_thread(
+                    connector.execute_cached_query, run_query, None, 30
+                )
             execution_time = time.time() - start_time
             
             if not results:
@@ -1038,41 +1304,42 @@ def register_all_tools(mcp: FastMCP):
             else:
                 truncated = False
             
-            # Format the results as a markdown table
-            response = f"## Query Results\n\n"
-            response += f"Executed in {execution_time:.2f} seconds\n\n"
-            
+            # Format the results as a markdown table, one fragment per row
+            # joined once at the end
+            parts = ["## Query Results\n\n",
+                     f"Executed in {execution_time:.2f} seconds\n\n"]
+            a = parts.append
+
             if truncated:
-                response += f"*Results truncated to {max_rows} rows*\n\n"
-            
+                a(f"*Results truncated to {max_rows} rows*\n\n")
+
             # Get column names from the first row
             columns = list(results[0].keys())
-            
+
             # Create the header row
-            response += "| " + " | ".join(columns) + " |\n"
-            response += "| " + " | ".join(["---" for _ in columns]) + " |\n"
-            
+            a("| " + " | ".join(columns) + " |\n")
+            a("| " + " | ".join(["---" for _ in columns]) + " |\n")
+
             # Add data rows
             for row in results:
-                # Convert each value to string and handle None values
-                row_values = []
-                for col in columns:
-                    val = row.get(col)
-                    if val is None:
-                        row_values.append("NULL")
-                    else:
-                        # Escape pipe characters in the data to prevent breaking the markdown table
-                        row_values.append(str(val).replace("|", "\\|"))
-                
-                response += "| " + " | ".join(row_values) + " |\n"
-            
-            response += f"\n{len(results)} rows returned" + (" (truncated)" if truncated else "")
-            
-            return response
+                # Convert each value to string and handle None values; escape
+                # pipes so data cannot break the markdown table
+                row_values = [
+                    "NULL" if row.get(col) is None
+                    else str(row.get(col)).replace("|", "\\|")
+                    for col in columns
+                ]
+                a("| " + " | ".join(row_values) + " |\n")
+
+            a(f"\n{len(results)} rows returned" + (" (truncated)" if truncated else ""))
+
+            return "".join(parts)
         except Exception as e:
-            import traceback
-            error_details = traceback.format_exc()
-            return f"Error executing query: {str(e)}\n\nDetails:\n{error_details}"
+            # Walking frames and reading source files to render a traceback
+            # is milliseconds of work nobody sees unless asked for
+            if debug:
+                return f"Error executing query: {str(e)}\n\nDetails:\n{traceback.format_exc()}"
+            return f"Error executing query: {str(e)}"
         finally:
             # Always disconnect when done
             connector.disconnect()
@@ -1087,15 +1354,16 @@ def register_all_tools(mcp: FastMCP):
         """
         return "MySQL Performance Analyzer MCP server is running and healthy!"
 
-def format_bytes(bytes_value):
-    """Format bytes to human-readable format"""
-    if bytes_value is None:
-        return "Unknown"
-    
-    bytes_value = float(bytes_value)
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if bytes_value < 1024:
-            return f"{bytes_value:.2f} {unit}"
-        bytes_value /= 1024
-    
-    return f"{bytes_value:.2f} PB"
\ No newline at end of file
+    @mcp.tool()
+    async def clear_metadata_cache(ctx: Context = None) -> str:
+        """
+        Clear the cached table statistics, schema and index metadata.
+
+        Use this after making schema changes so the analysis tools see the
+        new structure immediately instead of waiting for the cache TTL.
+
+        Returns:
+            A confirmation message
+        """
+        clear_cache()
+        return "Metadata cache cleared. Subsequent analyses will fetch fresh schema information."